@@ -0,0 +1,151 @@
+"""In-page accept agent (opt-in with IN_PAGE_ACCEPT=1).
+
+The agent script lives in the Synapse page and watches the DOM with its own
+MutationObserver. While armed, it clicks an Accept button in the same
+event-loop turn that the button appears, but only when hospital, patient and MRN
+are all non-empty (the same rule handle_new_case enforces). Popup Accept buttons
+win over dashboard rows. It then reports the case to Python through a binding.
+
+Python stays in charge of the acknowledge rule:
+* the agent disarms itself the moment it clicks, so it accepts at most one case
+  per arm;
+* Python takes the accepted case with collect(), which also disarms, and re-arms
+  the agent only after the user has acknowledged.
+
+collect() runs atomically in the page. Python can therefore call it before its own
+accept attempt and never races the agent for the same button. The armed flag is
+kept in sessionStorage so it survives a reload of the tab.
+"""
+import json
+
+
+ACCEPT_AGENT_BINDING = "__rescueBotAgentAccepted"
+
+ACCEPT_AGENT_JS = """
+(() => {
+    if (window.__rescueBotAgent) return;
+    const cfg = %s;
+    const STORAGE_KEY = "__rescueBotAgentArmed";
+    const store = (value) => { try { sessionStorage.setItem(STORAGE_KEY, value); } catch (e) {} };
+    const stored = () => { try { return sessionStorage.getItem(STORAGE_KEY) === "1"; } catch (e) { return false; } };
+    // Same matching as the case snapshot: a button whose text contains "accept", any case.
+    const acceptIn = (root) => Array.from(root.querySelectorAll("button"))
+        .find((b) => (b.textContent || "").toLowerCase().includes("accept")) || null;
+    const text = (root, selector) => {
+        const el = root.querySelector(selector);
+        return el ? (el.textContent || "").trim() : "";
+    };
+
+    const findTarget = () => {
+        const popup = document.querySelector(cfg.popup);
+        const popupButton = popup && acceptIn(popup);
+        if (popupButton) {
+            return {source: "popup", button: popupButton, info: {
+                hospital: text(popup, cfg.popup_hospital),
+                patient: text(popup, cfg.popup_patient),
+                patient_id: text(popup, cfg.popup_mrn),
+            }};
+        }
+        for (const row of document.querySelectorAll(cfg.rows)) {
+            const rowButton = acceptIn(row);
+            if (rowButton) {
+                return {source: "dashboard", button: rowButton, info: {
+                    hospital: text(row, cfg.row_hospital),
+                    patient: text(row, cfg.row_patient),
+                    patient_id: text(row, cfg.row_mrn),
+                }};
+            }
+        }
+        return null;
+    };
+
+    const agent = {
+        armed: stored(),
+        lastAccepted: null,
+        seenAt: null,  // When the armed agent first saw an Accept button
+        arm() {
+            this.armed = true;
+            this.lastAccepted = null;
+            store("1");
+            this.tryAccept();
+        },
+        collect() {
+            this.armed = false;
+            store("0");
+            const accepted = this.lastAccepted;
+            this.lastAccepted = null;
+            return accepted;
+        },
+        tryAccept() {
+            if (!this.armed) return;
+            const target = findTarget();
+            if (!target) {
+                this.seenAt = null;
+                return;
+            }
+            if (this.seenAt === null) this.seenAt = performance.now();
+            const info = target.info;
+            if (!info.hospital || !info.patient || !info.patient_id) return;
+
+            this.armed = false;
+            store("0");
+            target.button.click();
+            const accepted = Object.assign({}, info, {
+                source: target.source,
+                latency_ms: performance.now() - this.seenAt,
+                accepted_at: Date.now(),
+            });
+            this.seenAt = null;
+            this.lastAccepted = accepted;
+            const report = window[cfg.binding];
+            if (report) report(accepted);
+        },
+    };
+    window.__rescueBotAgent = agent;
+
+    const start = () => {
+        new MutationObserver(() => agent.tryAccept()).observe(document.documentElement, {
+            childList: true, subtree: true, characterData: true,
+        });
+        agent.tryAccept();
+    };
+    if (document.documentElement) start();
+    else document.addEventListener("DOMContentLoaded", start);
+})();
+"""
+
+
+class AcceptAgent:
+    def __init__(self, selectors, log, on_report=None):
+        self.script = ACCEPT_AGENT_JS % json.dumps(dict(selectors, binding=ACCEPT_AGENT_BINDING))
+        self.log = log
+        self.on_report = on_report  # Called from the binding, e.g. to wake the bot loop
+        self.reported = None  # Last case reported by the binding and not yet collected
+
+    async def install(self, page):
+        """Inject the agent into the page and any reload of it. It starts disarmed."""
+        await page.expose_binding(ACCEPT_AGENT_BINDING, self._on_accepted)
+        await page.add_init_script(self.script)
+        await page.evaluate(self.script)
+        self.log("🤖 In-page accept agent installed")
+
+    async def arm(self, page):
+        await page.evaluate("() => window.__rescueBotAgent && window.__rescueBotAgent.arm()")
+
+    async def collect(self, page):
+        """Disarm the agent and return the case it accepted since it was last armed, or None."""
+        try:
+            accepted = await page.evaluate("() => window.__rescueBotAgent ? window.__rescueBotAgent.collect() : null")
+        except Exception as e:
+            # The page went away; fall back to what the binding already reported
+            self.log(f"⚠️ Could not reach the accept agent: {e}")
+            accepted = None
+        accepted = accepted or self.reported
+        self.reported = None
+        return accepted
+
+    def _on_accepted(self, source, case):
+        self.reported = case
+        self.log(f"🤖 Agent accepted a case in-page ({case.get('source')}, {case.get('latency_ms', 0):.0f}ms after it appeared)")
+        if self.on_report:
+            self.on_report()
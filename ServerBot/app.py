@@ -1,311 +1,288 @@
-from flask import Flask, render_template, request, redirect, jsonify
-import subprocess
+from flask import Flask, Blueprint, Response, abort, g, render_template, request, redirect, jsonify, url_for
 import signal
-import requests
 import os
 import sys
 import time
 import json
 import logging
-from datetime import datetime, timezone, timedelta
-from threading import Thread, Event, Lock
+from threading import Thread, Condition, Event
 
+import logs
+from browser_host import BrowserHost
+from logs import log
+from metrics import REGISTRY, chromium_rss_bytes
+from operations import Operations
+from tenant import Tenant, DEFAULT_TENANT
 
-PST = timezone(timedelta(hours=-8), name="PST")
 
-
-def log(msg):
-    """Print with timestamp."""
-    timestamp = datetime.now(PST).strftime("%Y/%m/%d %H:%M:%S %Z")
-    print(f"[{timestamp}] {msg}", flush=True)
+logs.setup("supervisor", to_file=True, ring_size=logs.LOG_RING_SIZE)
 
 app = Flask(__name__)
 
-# Suppress /status request logs (too noisy)
+# Suppress polling request logs (/status, /events, /metrics, /logs, /operations; too noisy)
+# on the development server. gunicorn (see gunicorn.conf.py) has no access log.
 from werkzeug.serving import WSGIRequestHandler
 
 _original_log_request = WSGIRequestHandler.log_request
 
 def _filtered_log_request(self, *args, **kwargs):
-    if "GET /status" not in self.requestline and "GET / " not in self.requestline:
+    method, _, rest = self.requestline.partition(" ")
+    path = rest.split(" ")[0].split("?")[0]
+    # Covers both the root routes and their /t/<tenant>/ counterparts
+    polling = path.endswith(("/", "/status", "/events", "/metrics", "/logs")) or "/operations/" in path
+    if not (method == "GET" and polling):
         _original_log_request(self, *args, **kwargs)
 
 WSGIRequestHandler.log_request = _filtered_log_request
 
 
-def handle_container_shutdown(signum, frame):
-    """Handle container shutdown (SIGTERM from Docker)."""
+SHUTDOWN_TELEGRAM_TIMEOUT = 10
+
+
+def shutdown_tenants():
+    """Tell every user the bot is going away and deliver what is queued, sharing one deadline."""
     log("🛑 Container shutting down...")
-    send_telegram("🔴 Bot has stopped.")
+    stop_event_streams()
+    for tenant in TENANTS.values():
+        tenant.discard_prewarmed()
+        tenant.send_telegram("🔴 Bot has stopped.")
+    closers = [
+        Thread(target=tenant.notifier.close, kwargs={"timeout": SHUTDOWN_TELEGRAM_TIMEOUT}, daemon=True)
+        for tenant in TENANTS.values()
+    ]
+    for closer in closers:
+        closer.start()
+    deadline = time.monotonic() + SHUTDOWN_TELEGRAM_TIMEOUT
+    for closer in closers:
+        closer.join(max(0, deadline - time.monotonic()))
+    if BROWSER_HOST:
+        BROWSER_HOST.stop()
+
+
+def handle_container_shutdown(signum, frame):
+    """Handle container shutdown (SIGTERM from Docker) on the development server."""
+    shutdown_tenants()
     sys.exit(0)
 
 
-signal.signal(signal.SIGTERM, handle_container_shutdown)
-
-BOT_PROCESS = None
-BOT_LOCK = Lock()
-CASE_ACCEPTED_FILE = "case_accepted.json"
-CASE_ACKNOWLEDGED_FILE = "case_acknowledged"
-TIMER_THREAD = None
-TIMER_THREAD_LOCK = Lock()  # Separate lock for timer thread creation
-TIMER_STOP_EVENT = Event()
-TIME_LEFT = 0
-TIME_LOCK = Lock()
-TIMER_DURATION = 60 * 60  # 1 hour
-WARNING_TIME = 5 * 60  # 5 minutes before expiry
-WARNING_SENT = False
-
-
-def send_telegram(msg):
-    """Send a Telegram notification. Returns True on success, False on failure."""
-    token = os.environ.get("TELEGRAM_BOT_TOKEN", "")
-    chat_id = os.environ.get("TELEGRAM_CHAT_ID", "")
-
-    if not token or not chat_id:
-        log(f"Telegram disabled: {msg}")
-        return False
-
-    log(f"📤 Sending Telegram: {msg}")
-    try:
-        r = requests.post(
-            f"https://api.telegram.org/bot{token}/sendMessage",
-            data={"chat_id": chat_id, "text": msg},
-            timeout=10,
-        )
-        if r.ok:
-            log(f"📱 Telegram sent:\n{msg}")
-            return True
-        log(f"Telegram failed ({r.status_code}): {r.text}")
-        return False
-    except Exception as e:
-        log(f"Telegram error: {e}")
-        return False
-
-
-# ---------------- HELPERS ---------------- #
-
-def is_bot_running():
-    """Check if bot process is currently running (must hold BOT_LOCK)."""
-    return BOT_PROCESS is not None and BOT_PROCESS.poll() is None
-
-
-def get_status_data():
-    """Get current status, time remaining, and acknowledge state."""
-    with TIME_LOCK:
-        t = TIME_LEFT
-    h, rem = divmod(t, 3600)
-    m, s = divmod(rem, 60)
-
-    with BOT_LOCK:
-        status = "RUNNING" if is_bot_running() else "STOPPED"
-
-    needs_acknowledge = os.path.exists(CASE_ACCEPTED_FILE)
-
-    return {
-        "status": status,
-        "hours": h,
-        "minutes": m,
-        "seconds": s,
-        "needs_acknowledge": needs_acknowledge,
-    }
-
-
-def reset_timer():
-    """Reset timer to full duration."""
-    global TIME_LEFT, WARNING_SENT
-    with TIME_LOCK:
-        TIME_LEFT = TIMER_DURATION
-    WARNING_SENT = False
-    TIMER_STOP_EVENT.clear()
-    
-    # Also reset bot's internal failsafe timer
-    if is_bot_running():
-        try:
-            os.kill(BOT_PROCESS.pid, signal.SIGUSR1)
-        except (ProcessLookupError, OSError):
-            pass
-
-
-def kill_bot_process():
-    """Gracefully stop bot process. Must hold BOT_LOCK."""
-    if not is_bot_running():
-        return
-
-    try:
-        # Signal only the Python process so it can cleanly close the browser
-        os.kill(BOT_PROCESS.pid, signal.SIGTERM)
-        BOT_PROCESS.wait(timeout=10)
-    except subprocess.TimeoutExpired:
-        # Process didn't exit gracefully; kill the entire process group
-        try:
-            os.killpg(BOT_PROCESS.pid, signal.SIGKILL)
-            BOT_PROCESS.wait(timeout=5)
-        except (subprocess.TimeoutExpired, ProcessLookupError, OSError):
-            pass
-    except (ProcessLookupError, OSError):
-        pass
-
-
-def send_telegram_or_die(msg):
-    """Send Telegram notification. Kill bot if it fails."""
-    global BOT_PROCESS, TIME_LEFT
-    if not send_telegram(msg):
-        log("❌ Telegram failed. Killing bot.")
-        with BOT_LOCK:
-            kill_bot_process()
-            BOT_PROCESS = None
-        with TIME_LOCK:
-            TIME_LEFT = 0
-        TIMER_STOP_EVENT.set()
-        return False
-    return True
-
-
-# ---------------- BOT ---------------- #
-
-def start_bot_process(env):
-    global BOT_PROCESS, TIME_LEFT, WARNING_SENT
-    with BOT_LOCK:
-        if is_bot_running():
-            log("Bot already running.")
+# ---------------- EVENTS ---------------- #
+
+STATE_VERSION = 0
+STATE_CHANGED = Condition()
+SSE_KEEPALIVE_SECONDS = 15
+SHUTTING_DOWN = Event()
+
+
+def publish_state():
+    """Wake every /events stream so it re-reads state and pushes it if it changed."""
+    global STATE_VERSION
+    with STATE_CHANGED:
+        STATE_VERSION += 1
+        STATE_CHANGED.notify_all()
+
+
+def stop_event_streams():
+    """End every /events stream so they don't hold the server's graceful shutdown."""
+    SHUTTING_DOWN.set()
+    publish_state()
+
+
+def event_stream(tenant):
+    """Yield an SSE message whenever the tenant's dashboard state changes, plus periodic keepalives."""
+    last_state = None
+    seen_version = -1
+    while not SHUTTING_DOWN.is_set():
+        with STATE_CHANGED:
+            if STATE_VERSION == seen_version:
+                STATE_CHANGED.wait(SSE_KEEPALIVE_SECONDS)
+            woke_for_change = STATE_VERSION != seen_version
+            seen_version = STATE_VERSION
+        if SHUTTING_DOWN.is_set():
             return
-        reset_timer()
-        BOT_PROCESS = subprocess.Popen(
-            ["python", "-u", "sevaro_bot.py"],
-            env=env,
-            stdout=sys.stdout,
-            stderr=sys.stderr,
-            start_new_session=True,  # Create process group for clean kills
+
+        state = dict(tenant.get_event_state(), operations=OPERATIONS.recent(tenant.id))
+        if state != last_state:
+            last_state = state
+            payload = dict(state, server_time=round(time.time() * 1000))
+            yield f"data: {json.dumps(payload)}\n\n"
+        elif not woke_for_change:
+            yield ": keepalive\n\n"
+
+
+# ---------------- TENANTS ---------------- #
+
+def load_tenants():
+    """Build tenants from TENANTS (JSON: {"id": {"chat_id": ..., "bot_token": ...}}).
+    Without it, a single default tenant uses TELEGRAM_CHAT_ID as before."""
+    bot_token = os.environ.get("TELEGRAM_BOT_TOKEN", "")
+    config = TENANT_CONFIG
+    if not config:
+        config = {DEFAULT_TENANT: {"chat_id": os.environ.get("TELEGRAM_CHAT_ID", "")}}
+    tenants = {}
+    for tenant_id, settings in config.items():
+        if not tenant_id.replace("-", "").replace("_", "").isalnum():
+            raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+        tenants[tenant_id] = Tenant(
+            tenant_id,
+            settings.get("bot_token", bot_token),
+            str(settings.get("chat_id", "")),
+            log,
+            publish_state,
+            browser_endpoint=BROWSER_HOST.ensure_running if BROWSER_HOST else None,
         )
+    return tenants
+
 
-    if not send_telegram_or_die("🟢 Bot started."):
-        return
+TENANT_CONFIG = json.loads(os.environ.get("TENANTS") or "{}")
+# With several tenants, bots share one Chromium (one context per user) instead of one each.
+SHARED_BROWSER = os.environ.get("SHARED_BROWSER", "1" if len(TENANT_CONFIG) > 1 else "0") == "1"
+BROWSER_HOST = BrowserHost(log) if SHARED_BROWSER else None
 
-    BOT_PROCESS.wait()
-    with BOT_LOCK:
-        BOT_PROCESS = None
-    log("Bot stopped.")
+TENANTS = load_tenants()
+OPERATIONS = Operations(log, publish_state)
+# The tenant served at the legacy un-prefixed routes
+PRIMARY_TENANT = DEFAULT_TENANT if DEFAULT_TENANT in TENANTS else next(iter(TENANTS))
 
-    send_telegram("🔴 Bot has stopped.")
 
-    with TIME_LOCK:
-        TIME_LEFT = 0
+def run_bot(tenant, email, password, otp):
+    started = tenant.start_bot_process(email, password, otp)
+    return "started" if started else "already running"
 
 
-# ---------------- TIMER ---------------- #
+def prewarm_bots():
+    """Bring up an idle bot per user ahead of the first Start (see PREWARM_BOT in tenant.py)."""
+    for tenant in TENANTS.values():
+        Thread(target=tenant.prewarm, name=f"prewarm-{tenant.id}", daemon=True).start()
 
-def timer_loop():
-    global TIME_LEFT, WARNING_SENT
 
-    with TIME_LOCK:
-        if TIME_LEFT <= 0:
-            TIME_LEFT = TIMER_DURATION
+# ---------------- ROUTES ---------------- #
+# Every route is served per tenant under /t/<tenant_id>/, and for the primary tenant
+# also at the original un-prefixed paths.
 
-    while True:
-        time.sleep(1)
+bp = Blueprint("tenant", __name__)
 
-        if TIMER_STOP_EVENT.is_set():
-            break
 
-        with BOT_LOCK:
-            proc = BOT_PROCESS
+@bp.url_value_preprocessor
+def pull_tenant(endpoint, values):
+    tenant = TENANTS.get(values.pop("tenant_id"))
+    if tenant is None:
+        abort(404)
+    g.tenant = tenant
 
-        if proc is None or proc.poll() is not None:
-            with TIME_LOCK:
-                TIME_LEFT = 0
-            break
 
-        with TIME_LOCK:
-            if TIME_LEFT <= 0:
-                break
-            TIME_LEFT -= 1
-            current_time = TIME_LEFT
+@bp.url_defaults
+def add_tenant(endpoint, values):
+    if "tenant" in g:
+        values.setdefault("tenant_id", g.tenant.id)
 
-        # Send 5-minute warning
-        if current_time == WARNING_TIME and not WARNING_SENT:
-            WARNING_SENT = True
-            if not send_telegram_or_die("⚠️ Bot timer expires in 5 minutes! Refresh to extend."):
-                break
 
-    with BOT_LOCK:
-        if is_bot_running():
-            log(f"Auto-stopping bot after {TIMER_DURATION} seconds.")
-            send_telegram("⏰ Bot timer expired. Stopping bot.")  # Don't kill on failure, already stopping
-            kill_bot_process()
+def back_to_index():
+    return redirect(url_for(".index"))
 
-    with TIME_LOCK:
-        TIME_LEFT = 0
 
+def control(kind, fn):
+    """Run a control action on the tenant's operation lane and answer immediately.
+    fetch() callers asking for JSON get 202 with the operation; plain form posts
+    are redirected back to the page."""
+    op = OPERATIONS.submit(g.tenant.id, kind, fn)
+    if request.accept_mimetypes.best != "application/json":
+        return back_to_index()
+    response = jsonify(op)
+    response.status_code = 202
+    response.headers["Location"] = url_for(".operation", op_id=op["id"])
+    return response
 
-# ---------------- ROUTES ---------------- #
 
-@app.route("/")
+@bp.route("/")
 def index():
-    data = get_status_data()
-    return render_template("index.html", **data)
+    data = g.tenant.get_status_data()
+    return render_template(
+        "index.html",
+        tenant_id=g.tenant.id,
+        tenants=list(TENANTS) if len(TENANTS) > 1 else [],
+        base=url_for(".index").rstrip("/"),
+        **data,
+    )
 
 
-@app.route("/start", methods=["POST"])
+@bp.route("/start", methods=["POST"])
 def start():
-    log("Starting bot...")
+    tenant = g.tenant
+    tenant.log("Starting bot...")
+    args = (tenant, request.form["email"], request.form["password"], request.form["otp"])
+    return control("start", lambda: run_bot(*args))
 
-    env = os.environ.copy()
-    env["EMAIL"] = request.form["email"]
-    env["PASSWORD"] = request.form["password"]
-    env["OTP"] = request.form["otp"]
-    env["TELEGRAM_BOT_TOKEN"] = os.environ.get("TELEGRAM_BOT_TOKEN", "")
-    env["TELEGRAM_CHAT_ID"] = os.environ.get("TELEGRAM_CHAT_ID", "")
-    env["TIMER_DURATION"] = str(TIMER_DURATION)
 
-    Thread(target=start_bot_process, args=(env,), daemon=True).start()
+@bp.route("/stop", methods=["POST"])
+def stop():
+    return control("stop", g.tenant.stop)
 
-    # Protected timer thread creation to prevent duplicates
-    with TIMER_THREAD_LOCK:
-        global TIMER_THREAD
-        if TIMER_THREAD is None or not TIMER_THREAD.is_alive():
-            TIMER_THREAD = Thread(target=timer_loop, daemon=True)
-            TIMER_THREAD.start()
 
-    return redirect("/")
+@bp.route("/refresh_timer", methods=["POST"])
+def refresh_timer():
+    return control("refresh", g.tenant.refresh)
 
 
-@app.route("/stop", methods=["POST"])
-def stop():
-    global TIME_LEFT
-    TIMER_STOP_EVENT.set()
+@bp.route("/acknowledge", methods=["POST"])
+def acknowledge():
+    return control("acknowledge", g.tenant.acknowledge)
 
-    with BOT_LOCK:
-        kill_bot_process()
 
-    with TIME_LOCK:
-        TIME_LEFT = 0
+@bp.route("/operations/<op_id>")
+def operation(op_id):
+    op = OPERATIONS.get(op_id)
+    if op is None or op["tenant"] != g.tenant.id:
+        abort(404)
+    return jsonify(op)
 
-    return redirect("/")
 
+@bp.route("/status")
+def status():
+    return jsonify(dict(g.tenant.get_status_data(), operations=OPERATIONS.recent(g.tenant.id)))
 
-@app.route("/refresh_timer", methods=["POST"])
-def refresh_timer():
-    with BOT_LOCK:
-        if not is_bot_running():
-            return redirect("/")
-        reset_timer()
-    send_telegram_or_die("🔄 Timer refreshed to 1 hour.")
-    return redirect("/")
 
+@bp.route("/events")
+def events():
+    return Response(
+        event_stream(g.tenant),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.route("/acknowledge", methods=["POST"])
-def acknowledge():
-    if os.path.exists(CASE_ACCEPTED_FILE):
-        with open(CASE_ACKNOWLEDGED_FILE, "w") as f:
-            f.write("ack")
-        log("👤 User acknowledged accepted case.")
-    return redirect("/")
 
+@bp.route("/logs")
+def recent_logs():
+    """This user's recent log records (and the supervisor's own), oldest first, with
+    patient details left out. Filters: level (minimum), event (comma-separated), limit (default 200)."""
+    events = {event for event in request.args.get("event", "").split(",") if event}
+    records = logs.RING.query(
+        level=request.args.get("level"),
+        events=events,
+        tenant=g.tenant.id,
+        limit=request.args.get("limit", 200, type=int),
+    )
+    return jsonify([logs.public_record(record) for record in records])
 
-@app.route("/status")
-def status():
-    return jsonify(get_status_data())
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint covering every tenant."""
+    for tenant in TENANTS.values():
+        tenant.update_metrics(own_browser=BROWSER_HOST is None)
+    host = BROWSER_HOST.process if BROWSER_HOST else None
+    if host is not None and host.poll() is None:
+        REGISTRY.record("sevaro_chromium_rss_bytes", chromium_rss_bytes(host.pid) or 0, {"tenant": "shared"})
+    else:
+        REGISTRY.clear("sevaro_chromium_rss_bytes", tenant="shared")
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+app.register_blueprint(bp, url_prefix="/t/<tenant_id>")
+app.register_blueprint(bp, name="primary", url_defaults={"tenant_id": PRIMARY_TENANT})
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 3267)))
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
+    signal.signal(signal.SIGTERM, handle_container_shutdown)
+    prewarm_bots()
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 3267)), threaded=True)
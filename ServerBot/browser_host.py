@@ -0,0 +1,121 @@
+"""Shared headless Chromium for running several bots on one host.
+
+Run as a process (`python browser_host.py`), it launches one Chromium with a
+localhost-only CDP endpoint and keeps it alive until SIGTERM. Each bot then
+connects over CDP and works in its own BrowserContext, so memory grows by one
+context per user instead of one browser per user.
+
+BrowserHost is the supervisor-side handle that starts the process on demand.
+open_browser() is the bot-side helper that connects to it, or launches a private
+Chromium when no shared endpoint is configured.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+CDP_ENDPOINT_ENV = "BROWSER_CDP_ENDPOINT"
+CDP_PORT = int(os.environ.get("BROWSER_CDP_PORT", 9222))
+READY_LINE = "ready"
+
+# Headless Chromium runs for hours; skip subsystems a text-scraping bot never needs.
+CHROMIUM_ARGS = [
+    "--disable-ipv6",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--mute-audio",
+]
+
+
+async def open_browser(playwright):
+    """Return (browser, shared). Connects to the shared host when BROWSER_CDP_ENDPOINT is set."""
+    endpoint = os.environ.get(CDP_ENDPOINT_ENV)
+    if endpoint:
+        return await playwright.chromium.connect_over_cdp(endpoint), True
+    return await playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS), False
+
+
+class BrowserHost:
+    """Starts and stops the shared browser process for the supervisor."""
+
+    def __init__(self, log, port=CDP_PORT):
+        self.log = log
+        self.port = port
+        self.process = None
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def ensure_running(self, timeout=60):
+        """Start the host if needed and wait until Chromium is accepting CDP connections."""
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                return self.endpoint
+            self.log("🌐 Starting shared browser...")
+            self.process = subprocess.Popen(
+                [sys.executable, "-u", "browser_host.py"],
+                env=dict(os.environ, BROWSER_CDP_PORT=str(self.port)),
+                stdout=subprocess.PIPE,
+                stderr=sys.stderr,
+                text=True,
+                start_new_session=True,
+            )
+            ready = threading.Event()
+            threading.Thread(target=lambda: self._read_ready(ready), daemon=True).start()
+            if not ready.wait(timeout):
+                self._stop_locked()
+                raise RuntimeError("Shared browser did not become ready")
+            self.log(f"🌐 Shared browser ready at {self.endpoint}")
+            return self.endpoint
+
+    def stop(self):
+        with self._lock:
+            self._stop_locked()
+
+    def _read_ready(self, ready):
+        for line in self.process.stdout:
+            if line.strip() == READY_LINE:
+                ready.set()
+
+    def _stop_locked(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+
+
+def main():
+    from playwright.sync_api import sync_playwright
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(
+            headless=True,
+            args=CHROMIUM_ARGS + [
+                f"--remote-debugging-port={CDP_PORT}",
+                "--remote-debugging-address=127.0.0.1",
+            ],
+        )
+        print(READY_LINE, flush=True)
+        try:
+            while not stopping and browser.is_connected():
+                time.sleep(1)
+        finally:
+            browser.close()
+
+
+if __name__ == "__main__":
+    main()
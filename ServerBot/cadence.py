@@ -0,0 +1,102 @@
+"""Adaptive polling cadence for the bot loop.
+
+Instead of checking the dashboard at a fixed interval, PollCadence picks each
+wait from recent activity and from when cases have historically arrived:
+
+* right after a case (within RECENT_ACTIVITY_SECONDS) it polls at the minimum;
+* otherwise the interval backs off geometrically on every quiet pass;
+* the back-off ceiling is lowered during hours that see more than their share
+  of arrivals, so busy hours stay responsive while 3am stays cheap.
+
+Arrivals are counted per local hour of day in a small JSON file that survives
+restarts (CADENCE_STATS_FILE). Counts are halved once they grow large, so the
+histogram follows seasonal changes instead of freezing.
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+
+CADENCE_STATS_FILE = os.environ.get("CADENCE_STATS_FILE", "case_arrivals.json")
+RECENT_ACTIVITY_SECONDS = float(os.environ.get("CADENCE_RECENT_SECONDS", 10 * 60))
+BACKOFF_FACTOR = 1.5
+MIN_SAMPLES = 20          # Arrivals needed before the hourly histogram is trusted
+MAX_TOTAL_SAMPLES = 2000  # Halve every bucket beyond this
+
+
+class PollCadence:
+    def __init__(self, min_interval, max_interval, tz, path=CADENCE_STATS_FILE, log=print):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.tz = tz
+        self.path = path
+        self.log = log
+        self.hours = [0] * 24
+        self.last_arrival = None
+        self._interval = min_interval
+        self._reason = None
+        self._load()
+
+    def record_arrival(self, now=None):
+        """Count a new case at `now` (epoch seconds) and poll at the minimum again. Only in
+        memory: call save() once the case is handled, so the disk never delays the click."""
+        now = time.time() if now is None else now
+        self.hours[self._hour(now)] += 1
+        if sum(self.hours) > MAX_TOTAL_SAMPLES:
+            self.hours = [count // 2 for count in self.hours]
+        self.last_arrival = now
+        self._interval = self.min_interval
+
+    def hour_weight(self, now=None):
+        """How busy this hour is relative to an average hour (1.0 = average, 0 when unknown)."""
+        total = sum(self.hours)
+        if total < MIN_SAMPLES:
+            return 0.0
+        now = time.time() if now is None else now
+        return self.hours[self._hour(now)] * 24 / total
+
+    def next_interval(self, now=None):
+        """Seconds to wait before the next pass. Call once per quiet pass."""
+        now = time.time() if now is None else now
+        if self.last_arrival is not None and now - self.last_arrival < RECENT_ACTIVITY_SECONDS:
+            self._interval = self.min_interval
+            return self._report(self._interval, "recent case activity")
+
+        weight = self.hour_weight(now)
+        ceiling = self.max_interval / weight if weight > 1 else self.max_interval
+        ceiling = max(self.min_interval, ceiling)
+        self._interval = min(ceiling, max(self.min_interval, self._interval * BACKOFF_FACTOR))
+        return self._report(self._interval, "busy hour" if weight > 1 else "quiet")
+
+    def save(self):
+        """Write the histogram to `path` (blocking; the bot runs it on a worker thread)."""
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"hours": self.hours, "last_arrival": self.last_arrival}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.log(f"⚠️ Could not save case arrival stats: {e}")
+
+    # ---- Internals ----
+
+    def _hour(self, ts):
+        return datetime.fromtimestamp(ts, self.tz).hour
+
+    def _report(self, interval, reason):
+        if reason != self._reason:
+            self._reason = reason
+            self.log(f"⏱️ Poll cadence: {reason} ({interval:.1f}s)")
+        return interval
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            hours = saved["hours"]
+            if len(hours) == 24:
+                self.hours = [int(count) for count in hours]
+            self.last_arrival = saved.get("last_arrival")
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
@@ -0,0 +1,273 @@
+"""Network-layer feed of rescue cases.
+
+The Synapse SPA learns about rescue cases from its own API responses and
+WebSocket pushes before Angular renders them. CaseFeed listens to the same
+traffic and decodes recognizable payloads into RescueCase records, so the bot
+can act on a case without scraping the rendered markup. Payloads it does not
+recognize are ignored, and the bot falls back to DOM scraping.
+
+The feed also remembers the GET request that returned the case list (URL and
+the SPA's own headers), so the bot can re-fetch it directly with the context's
+authenticated APIRequestContext (probe()) instead of rebuilding the dashboard UI.
+"""
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+
+
+FEED_URL_PATTERN = re.compile(os.environ.get("CASE_FEED_URL_PATTERN", r"rescue"), re.IGNORECASE)
+# SignalR targets (or "event"/"method" names in plain JSON frames) that announce new or
+# pending cases. Other pushes, e.g. a case accepted by someone else, are not pending cases.
+FEED_EVENT_PATTERN = re.compile(os.environ.get("CASE_FEED_EVENT_PATTERN", r"add|new|creat|list|pending"), re.IGNORECASE)
+FEED_EVENT_KEYS = ("target", "event", "method")
+FEED_MAX_AGE_SECONDS = float(os.environ.get("CASE_FEED_MAX_AGE", 120))
+SIGNALR_RECORD_SEPARATOR = "\x1e"
+PROBE_TIMEOUT_MS = 5000
+# Left to the APIRequestContext (cookies come from the context's own jar)
+PROBE_DROP_HEADERS = {"host", "content-length", "cookie", "connection", "accept-encoding"}
+
+# Field aliases, compared after lowercasing and dropping non-alphanumerics.
+HOSPITAL_KEYS = ("facilityname", "hospitalname", "sitename", "facility", "hospital")
+PATIENT_KEYS = ("patientname", "patientfullname", "fullname", "patient")
+FIRST_NAME_KEYS = ("patientfirstname", "firstname")
+LAST_NAME_KEYS = ("patientlastname", "lastname")
+MRN_KEYS = ("mrn", "patientmrn", "medicalrecordnumber", "patientmedicalrecordnumber")
+CASE_ID_KEYS = ("rescueid", "caseid", "consultid", "requestid", "id")
+
+
+@dataclass(frozen=True)
+class RescueCase:
+    hospital: str | None
+    patient: str | None
+    patient_id: str | None
+    case_id: str | None = None
+    source: str = ""
+    seen_at: float = 0.0
+
+    @property
+    def is_complete(self):
+        """True when hospital, patient and MRN are all present (required before accepting)."""
+        return bool(self.hospital and self.patient and self.patient_id)
+
+    @property
+    def key(self):
+        return self.case_id or self.patient_id
+
+
+def _norm(key):
+    return re.sub(r"[^a-z0-9]", "", str(key).lower())
+
+
+def _scalar(value):
+    if isinstance(value, (str, int)) and not isinstance(value, bool):
+        text = str(value).strip()
+        return text or None
+    return None
+
+
+def _lookup(fields, keys):
+    for key in keys:
+        value = _scalar(fields.get(key))
+        if value:
+            return value
+    return None
+
+
+def _case_from_dict(obj, source):
+    """Build a RescueCase from a dict if it looks like a case, else None."""
+    fields = {_norm(k): v for k, v in obj.items()}
+    nested_patient = fields.get("patient") if isinstance(fields.get("patient"), dict) else None
+    nested_facility = fields.get("facility") if isinstance(fields.get("facility"), dict) else None
+    patient_fields = {_norm(k): v for k, v in nested_patient.items()} if nested_patient else {}
+    facility_fields = {_norm(k): v for k, v in nested_facility.items()} if nested_facility else {}
+
+    patient_id = _lookup(fields, MRN_KEYS) or _lookup(patient_fields, MRN_KEYS)
+    if not patient_id:
+        return None
+
+    hospital = _lookup(fields, HOSPITAL_KEYS) or _lookup(facility_fields, ("name",) + HOSPITAL_KEYS)
+    patient = _lookup(fields, PATIENT_KEYS) or _lookup(patient_fields, ("name",) + PATIENT_KEYS)
+    if not patient:
+        for names in (fields, patient_fields):
+            first, last = _lookup(names, FIRST_NAME_KEYS), _lookup(names, LAST_NAME_KEYS)
+            if first or last:
+                patient = " ".join(part for part in (first, last) if part)
+                break
+    if not hospital and not patient:
+        return None
+
+    return RescueCase(
+        hospital=hospital,
+        patient=patient,
+        patient_id=patient_id,
+        case_id=_lookup(fields, CASE_ID_KEYS),
+        source=source,
+        seen_at=time.time(),
+    )
+
+
+def is_collection(payload):
+    """True for a list of cases (bare, or wrapped like {"data": {"items": [...]}}),
+    False for a single record such as a case detail."""
+    stack = [payload]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, list):
+            return True
+        if isinstance(obj, dict) and _case_from_dict(obj, "") is None:
+            stack.extend(value for value in obj.values() if isinstance(value, (dict, list)))
+    return False
+
+
+def decode_payload(payload, source=""):
+    """Walk a decoded JSON payload and return every case record found in it."""
+    cases = []
+    stack = [payload]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            case = _case_from_dict(obj, source)
+            if case is not None:
+                cases.append(case)
+                continue
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(reversed(obj))
+    return cases
+
+
+def _announces_cases(record):
+    """True unless the record names an event (SignalR target) that is not a new or pending case."""
+    if not isinstance(record, dict):
+        return True
+    for key in FEED_EVENT_KEYS:
+        name = record.get(key)
+        if isinstance(name, str):
+            return FEED_EVENT_PATTERN.search(name) is not None
+    return True
+
+
+def decode_frame(frame, source="websocket"):
+    """Decode a WebSocket frame (plain JSON or SignalR records) into case records.
+    Records for other events (see FEED_EVENT_PATTERN) are skipped."""
+    if isinstance(frame, bytes):
+        try:
+            frame = frame.decode("utf-8")
+        except UnicodeDecodeError:
+            return []
+    cases = []
+    for record in frame.split(SIGNALR_RECORD_SEPARATOR):
+        record = record.strip()
+        if not record or record[0] not in "[{":
+            continue
+        try:
+            payload = json.loads(record)
+        except ValueError:
+            continue
+        if _announces_cases(payload):
+            cases.extend(decode_payload(payload, source))
+    return cases
+
+
+class CaseFeed:
+    """Latest rescue cases seen on the wire, keyed by case id (or MRN)."""
+
+    def __init__(self, on_update=None, max_age=FEED_MAX_AGE_SECONDS, log=print):
+        self.on_update = on_update  # Called with (cases, origin) when the set of known cases changes
+        self.max_age = max_age
+        self.log = log
+        self.list_endpoint = None  # (url, headers) of the GET that returns the case list
+        self._cases = {}
+
+    # ---- Playwright hooks ----
+
+    def attach_context(self, context):
+        """Listen on every page of the context, including tabs opened later."""
+        for page in context.pages:
+            self.attach(page)
+        context.on("page", self.attach)
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+        page.on("websocket", self._on_websocket)
+
+    async def _on_response(self, response):
+        try:
+            request = response.request
+            if request.resource_type not in ("xhr", "fetch"):
+                return
+            if not FEED_URL_PATTERN.search(response.url):
+                return
+            if "json" not in (response.headers.get("content-type") or ""):
+                return
+            payload = await response.json()
+        except Exception:
+            return
+        if not is_collection(payload):
+            return  # e.g. one case's details, which says nothing about what is pending
+        cases = decode_payload(payload, source=f"response {response.url}")
+        if cases and request.method == "GET" and self.list_endpoint is None:
+            # Keep the first list learned; later GETs (filtered views, other lists) don't replace it
+            headers = {k: v for k, v in request.headers.items() if k.lower() not in PROBE_DROP_HEADERS}
+            self.list_endpoint = (response.url, headers)
+            self.log(f"📡 Learned the case list endpoint: {response.url}")
+        # The list endpoint returns the full pending set, so it replaces what we had.
+        replace = self.list_endpoint is not None and self.list_endpoint[0] == response.url
+        if cases or replace:
+            self._record(cases, response.url, replace=replace)
+
+    async def probe(self, request_context, timeout_ms=PROBE_TIMEOUT_MS):
+        """Re-fetch the learned case list with the context's cookies and the SPA's headers.
+        Returns the pending cases (possibly none), or None if no endpoint is known yet or the call failed."""
+        if self.list_endpoint is None:
+            return None
+        url, headers = self.list_endpoint
+        try:
+            response = await request_context.get(url, headers=headers, timeout=timeout_ms, fail_on_status_code=False)
+            if not response.ok:
+                return None
+            cases = decode_payload(await response.json(), source=f"probe {url}")
+        except Exception:
+            return None
+        self._record(cases, f"probe {url}", replace=True)
+        return cases
+
+    def _on_websocket(self, ws):
+        if not FEED_URL_PATTERN.search(ws.url) and "hub" not in ws.url.lower():
+            return
+        ws.on("framereceived", lambda frame: self._on_frame(ws.url, frame))
+
+    def _on_frame(self, url, frame):
+        cases = decode_frame(frame, source=f"websocket {url}")
+        if cases:
+            self._record(cases, url)
+
+    # ---- State ----
+
+    def _record(self, cases, origin, replace=False):
+        """Store `cases` (instead of all known ones if `replace`). on_update only hears of
+        changes, so the probe and repeated pushes of the same list stay quiet."""
+        before = set(self._cases)
+        if replace:
+            self._cases = {}
+        for case in cases:
+            if case.key:
+                self._cases[case.key] = case
+        if self.on_update and set(self._cases) != before:
+            self.on_update(cases, origin)
+
+    def pending(self):
+        """Cases seen within max_age, oldest first."""
+        cutoff = time.time() - self.max_age
+        self._cases = {k: c for k, c in self._cases.items() if c.seen_at >= cutoff}
+        return sorted(self._cases.values(), key=lambda c: c.seen_at)
+
+    def sole_pending_case(self):
+        """The pending case if exactly one complete case is known, else None."""
+        cases = [c for c in self.pending() if c.is_complete]
+        return cases[0] if len(cases) == 1 else None
+
+    def forget(self, case):
+        self._cases.pop(case.key, None)
@@ -0,0 +1,107 @@
+"""Event channel between the Flask supervisor (app.py) and the bot process.
+
+Newline-delimited JSON messages over a Unix socket pair. The supervisor creates
+the pair, keeps one end, and passes the other to the bot as an inherited file
+descriptor (BOT_CHANNEL_FD). Each side runs a reader thread that blocks on the
+socket and dispatches incoming events to registered handlers.
+"""
+import json
+import os
+import socket
+import threading
+
+
+CHANNEL_FD_ENV = "BOT_CHANNEL_FD"
+
+# Bot -> supervisor
+CASE_DETECTED = "case_detected"
+CASE_ACCEPTED = "case_accepted"
+HEARTBEAT = "heartbeat"
+METRIC = "metric"
+SEEN_CASES = "seen_cases"
+LOG = "log"
+# Supervisor -> bot
+START = "start"
+ACKNOWLEDGE = "acknowledge"
+TIMER_RESET = "timer_reset"
+SHUTDOWN = "shutdown"
+# Local pseudo-event, dispatched when the other side hangs up
+CLOSED = "closed"
+
+
+class EventChannel:
+    def __init__(self, sock, log=print):
+        self.sock = sock
+        self.log = log
+        self._handlers = {}
+        self._send_lock = threading.Lock()
+        self._reader = None
+        self._closed = False
+
+    @classmethod
+    def create_pair(cls, log=print):
+        """Return (supervisor_channel, child_socket). Pass child_socket.fileno() to the bot."""
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        child_sock.set_inheritable(True)
+        return cls(parent_sock, log), child_sock
+
+    @classmethod
+    def from_env(cls, log=print):
+        """Open the bot's end of the channel from BOT_CHANNEL_FD, or None when run standalone."""
+        fd = os.environ.get(CHANNEL_FD_ENV)
+        if not fd:
+            return None
+        return cls(socket.socket(fileno=int(fd)), log)
+
+    def on(self, event, handler):
+        """Register `handler(message)` for `event`. Handlers run on the reader thread."""
+        self._handlers[event] = handler
+        return self
+
+    def start(self):
+        self._reader = threading.Thread(target=self._read_loop, name="event-channel", daemon=True)
+        self._reader.start()
+        return self
+
+    def send(self, event, **fields):
+        """Send one event. Returns False if the other side is gone."""
+        line = json.dumps({"event": event, **fields}) + "\n"
+        try:
+            with self._send_lock:
+                self.sock.sendall(line.encode("utf-8"))
+            return True
+        except OSError as e:
+            if not self._closed:
+                self.log(f"⚠️ Channel send failed ({event}): {e}")
+            return False
+
+    def close(self):
+        self._closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _read_loop(self):
+        try:
+            with self.sock.makefile("r", encoding="utf-8") as stream:
+                for line in stream:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        self.log(f"⚠️ Ignoring malformed channel message: {line!r}")
+                        continue
+                    self._dispatch(message.get("event"), message)
+        except (OSError, ValueError):
+            pass
+        self._dispatch(CLOSED, {"event": CLOSED})
+
+    def _dispatch(self, event, message):
+        handler = self._handlers.get(event)
+        if handler is None:
+            return
+        try:
+            handler(message)
+        except Exception as e:
+            self.log(f"⚠️ Channel handler for {event} failed: {e}")
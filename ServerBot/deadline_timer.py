@@ -0,0 +1,90 @@
+"""Deadline-based countdown for the bot's run timer.
+
+The timer stores a monotonic expiry instead of counting ticks, so it does not
+drift under load. The warning and the expiry are one-shot threading.Timers that
+are rescheduled whenever the timer is refreshed; the time left is computed on
+read.
+"""
+import threading
+import time
+
+
+class DeadlineTimer:
+    def __init__(self, duration, warning_before, on_warning, on_expire):
+        self.duration = duration
+        self.warning_before = warning_before
+        self.on_warning = on_warning
+        self.on_expire = on_expire
+        self._lock = threading.Lock()
+        self._expires_at = None  # time.monotonic() deadline, None when stopped
+        self._timers = []
+        self._generation = 0     # Bumped on every (re)schedule so stale timers are ignored
+
+    def start(self):
+        """Start, or restart from full duration, and schedule the warning and expiry."""
+        with self._lock:
+            self._cancel_timers()
+            self._generation += 1
+            generation = self._generation
+            self._expires_at = time.monotonic() + self.duration
+            if self.duration > self.warning_before:
+                self._schedule(self.duration - self.warning_before, self._fire_warning, generation)
+            self._schedule(self.duration, self._fire_expire, generation)
+
+    refresh = start
+
+    def cancel(self):
+        """Stop the countdown without firing anything."""
+        with self._lock:
+            self._cancel_timers()
+            self._generation += 1
+            self._expires_at = None
+
+    @property
+    def running(self):
+        return self.remaining() > 0
+
+    def remaining(self):
+        """Whole seconds left, 0 when stopped or expired."""
+        with self._lock:
+            expires_at = self._expires_at
+        if expires_at is None:
+            return 0
+        return max(0, int(round(expires_at - time.monotonic())))
+
+    def deadline(self):
+        """Wall-clock expiry (epoch seconds) for clients that count down themselves, or None."""
+        with self._lock:
+            expires_at = self._expires_at
+        if expires_at is None:
+            return None
+        return time.time() + max(0.0, expires_at - time.monotonic())
+
+    # ---- Internals (call with _lock held) ----
+
+    def _schedule(self, delay, callback, generation):
+        timer = threading.Timer(delay, callback, args=(generation,))
+        timer.daemon = True
+        timer.start()
+        self._timers.append(timer)
+
+    def _cancel_timers(self):
+        for timer in self._timers:
+            timer.cancel()
+        self._timers = []
+
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _fire_warning(self, generation):
+        if self._is_current(generation):
+            self.on_warning()
+
+    def _fire_expire(self, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._expires_at = None
+            self._timers = []
+        self.on_expire()
@@ -0,0 +1,178 @@
+"""Background store for debug HTML dumps.
+
+The caller hands over an HTML string and returns immediately; a writer thread
+gzips it and stores it content-addressed (objects/<sha256>.html.gz), so
+identical snapshots are kept once. Every dump also gets a line in index.jsonl
+(timestamp, label, hash). The store keeps within a total size and file count
+budget by evicting the least recently written snapshots; the index is cut back to
+its newest lines once it grows past DUMP_MAX_INDEX_LINES, since deduplicated dumps
+add lines without adding files.
+"""
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+
+DUMP_DIR = os.environ.get("DUMP_DIR", "data")
+DUMP_MAX_BYTES = int(os.environ.get("DUMP_MAX_BYTES", 200 * 1024 * 1024))
+DUMP_MAX_FILES = int(os.environ.get("DUMP_MAX_FILES", 500))
+DUMP_MAX_INDEX_LINES = int(os.environ.get("DUMP_MAX_INDEX_LINES", 5000))
+DUMP_QUEUE_SIZE = 32
+
+
+class DumpStore:
+    def __init__(self, directory=DUMP_DIR, max_bytes=DUMP_MAX_BYTES, max_files=DUMP_MAX_FILES,
+                 max_index_lines=DUMP_MAX_INDEX_LINES, log=print):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_index_lines = max_index_lines
+        self.log = log
+        self._queue = queue.Queue(maxsize=DUMP_QUEUE_SIZE)
+        self._objects = None  # sha -> (size, mtime), loaded lazily on the writer thread
+        self._index_lines = 0  # Lines in index.jsonl, counted with _objects
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ---- Producer side ----
+
+    def submit(self, label, html):
+        """Queue a snapshot for writing. Never blocks; drops the dump if the writer is backed up."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((time.time(), label, html))
+            return True
+        except queue.Full:
+            self.log(f"⚠️ Dump queue full, dropping {label} snapshot")
+            return False
+
+    def flush(self, timeout=None):
+        """Wait until queued dumps are written. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    # ---- Reader side (debug tooling) ----
+
+    def entries(self):
+        """Index records (ts, label, sha, path) whose snapshot is still stored, oldest first."""
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+        for record in records:
+            record["path"] = self._object_path(record["sha"])
+        return [r for r in records if os.path.exists(r["path"])]
+
+    def read(self, sha):
+        with gzip.open(self._object_path(sha), "rt", encoding="utf-8") as f:
+            return f.read()
+
+    # ---- Writer thread ----
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="dump-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            ts, label, html = self._queue.get()
+            try:
+                self._write(ts, label, html)
+            except Exception as e:
+                self.log(f"⚠️ Could not store {label} dump: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _object_path(self, sha):
+        return os.path.join(self.objects_dir, f"{sha}.html.gz")
+
+    def _load_objects(self):
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._objects = {}
+        for name in os.listdir(self.objects_dir):
+            if name.endswith(".html.gz"):
+                st = os.stat(os.path.join(self.objects_dir, name))
+                self._objects[name[: -len(".html.gz")]] = (st.st_size, st.st_mtime)
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                self._index_lines = sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            self._index_lines = 0
+
+    def _write(self, ts, label, html):
+        if self._objects is None:
+            self._load_objects()
+
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha)
+        if sha in self._objects:
+            os.utime(path)  # Mark as recently used
+            size = self._objects[sha][0]
+            dedup = " (deduplicated)"
+        else:
+            tmp = f"{path}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+            dedup = ""
+        self._objects[sha] = (size, time.time())
+
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": ts, "label": label, "sha": sha}) + "\n")
+        self._index_lines += 1
+        self.log(f"📄 Page HTML dumped: {label} -> {sha[:12]}{dedup}")
+
+        if not self._evict() and self._index_lines > self.max_index_lines:
+            # Keep half, so the rewrite happens once per max_index_lines / 2 dumps, not on every one
+            self._compact_index(keep=self.max_index_lines // 2)
+
+    def _evict(self):
+        """Remove the oldest snapshots while over budget. Returns True if the index was compacted."""
+        total = sum(size for size, _ in self._objects.values())
+        if total <= self.max_bytes and len(self._objects) <= self.max_files:
+            return False
+        evicted = 0
+        for sha, (size, _) in sorted(self._objects.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes and len(self._objects) <= self.max_files:
+                break
+            try:
+                os.remove(self._object_path(sha))
+            except FileNotFoundError:
+                pass
+            del self._objects[sha]
+            total -= size
+            evicted += 1
+        self._compact_index(keep=self.max_index_lines)
+        self.log(f"🧹 Evicted {evicted} old page dump(s)")
+        return True
+
+    def _compact_index(self, keep):
+        """Drop index lines whose snapshot has been evicted, then all but the newest `keep`."""
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                lines = [line for line in f if line.strip() and json.loads(line)["sha"] in self._objects]
+        except FileNotFoundError:
+            return
+        lines = lines[-keep:] if keep > 0 else []
+        self._index_lines = len(lines)
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp, self.index_path)
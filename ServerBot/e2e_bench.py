@@ -0,0 +1,231 @@
+"""End-to-end latency benchmark: the real bot against a local mock Sevaro and Telegram.
+
+Starts mock_sevaro.py on localhost, runs sevaro_bot.py against it (login, Synapse
+launch, the full bot_loop), injects cases on an arrival schedule and records, for
+every case:
+
+    appearance -> detection      case rendered in the dashboard -> bot reports it saw it
+    detection  -> click          -> Accept button clicked in the page
+    click      -> notification   -> Telegram message received
+
+The bot talks to the harness over the same event channel the supervisor uses; the
+harness acknowledges each accepted case as soon as its Telegram message arrives,
+like a user who reacts instantly. No network access is needed.
+
+    python e2e_bench.py --cases 20 --rate 6 --arrivals poisson
+"""
+import argparse
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import channel
+from browser_host import CDP_ENDPOINT_ENV
+from mock_sevaro import MockSevaro
+
+
+READY_MESSAGE = "Bot is now watching"
+ACCEPTED_MESSAGE = "Rescue case accepted"
+PHASES = (
+    ("appearance -> detection", "rendered", "detected"),
+    ("detection -> click", "detected", "clicked"),
+    ("click -> notification", "clicked", "notified"),
+    ("appearance -> notification", "rendered", "notified"),
+)
+PERCENTILES = (50, 95, 99)
+
+
+def log(msg):
+    print(f"[bench] {msg}", flush=True)
+
+
+def arrival_offsets(count, rate_per_minute, process, rng):
+    """Seconds after the first case at which each case arrives."""
+    mean_gap = 60 / rate_per_minute
+    offsets = [0.0]
+    for _ in range(count - 1):
+        gap = rng.expovariate(1 / mean_gap) if process == "poisson" else mean_gap
+        offsets.append(offsets[-1] + gap)
+    return offsets
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.mock = MockSevaro(on_message=self._on_message)
+        self.ready = threading.Event()
+        self.bot = None
+        self.bot_channel = None
+        self.bot_log = None
+        self.workdir = tempfile.mkdtemp(prefix="sevaro-bench-")
+
+    # ---- Bot events ----
+
+    def _on_message(self, text):
+        if READY_MESSAGE in text:
+            self.ready.set()
+        elif ACCEPTED_MESSAGE in text and self.bot_channel is not None:
+            self.bot_channel.send(channel.ACKNOWLEDGE)
+
+    def _on_case_detected(self, message):
+        """Attribute the detection to every case already rendered but not yet detected."""
+        with self.mock.changed:
+            for entry in self.mock.timeline.values():
+                if "detected" in entry or "clicked" in entry:
+                    continue
+                if entry.get("rendered", math.inf) <= message["ts"]:
+                    entry["detected"] = message["ts"]
+
+    # ---- Bot process ----
+
+    def start_bot(self, base_url):
+        bot_channel, child_sock = channel.EventChannel.create_pair(log)
+        bot_channel.on(channel.CASE_DETECTED, self._on_case_detected)
+        env = dict(
+            os.environ,
+            EMAIL="bench@example.com",
+            PASSWORD="bench",
+            OTP="000000",
+            TELEGRAM_BOT_TOKEN="bench",
+            TELEGRAM_CHAT_ID="0",
+            TELEGRAM_API_URL=base_url,
+            SEVARO_LOGIN_URL=base_url,
+            EXTERNAL_IP_URL=f"{base_url}/ip",
+            STORAGE_STATE_FILE=os.path.join(self.workdir, "okta_state.json"),
+            DUMP_DIR=os.path.join(self.workdir, "data"),
+            CADENCE_STATS_FILE=os.path.join(self.workdir, "case_arrivals.json"),
+            TIMER_DURATION=str(24 * 60 * 60),
+            **{channel.CHANNEL_FD_ENV: str(child_sock.fileno())},
+        )
+        env.pop(CDP_ENDPOINT_ENV, None)
+        if not self.args.verbose:
+            self.bot_log = open(os.path.join(self.workdir, "bot.log"), "w")
+        try:
+            self.bot = subprocess.Popen(
+                [sys.executable, "-u", "sevaro_bot.py"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=env,
+                stdout=self.bot_log,
+                stderr=subprocess.STDOUT,
+                pass_fds=(child_sock.fileno(),),
+                start_new_session=True,
+            )
+        finally:
+            child_sock.close()
+        self.bot_channel = bot_channel.start()
+
+    def stop_bot(self):
+        if self.bot is not None and self.bot.poll() is None:
+            self._shutdown_bot()
+        if self.bot_channel is not None:
+            self.bot_channel.close()
+        if self.bot_log is not None:
+            self.bot_log.close()
+
+    def _shutdown_bot(self):
+        if not self.bot_channel.send(channel.SHUTDOWN):
+            os.kill(self.bot.pid, signal.SIGTERM)
+        try:
+            self.bot.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.bot.pid, signal.SIGKILL)
+            self.bot.wait()
+
+    # ---- Run ----
+
+    def run(self):
+        args = self.args
+        base_url = self.mock.serve()
+        log(f"Mock Sevaro at {base_url}, bot output in {self.workdir}")
+        try:
+            started = time.monotonic()
+            self.start_bot(base_url)
+            while not self.ready.wait(1):
+                if self.bot.poll() is not None or time.monotonic() - started > args.startup_timeout:
+                    log("❌ Bot did not start watching; see bot.log")
+                    return None
+            log(f"Bot ready after {time.monotonic() - started:.1f}s; injecting {args.cases} case(s)")
+
+            rng = random.Random(args.seed)
+            began = time.monotonic()
+            for i, offset in enumerate(arrival_offsets(args.cases, args.rate, args.arrivals, rng)):
+                time.sleep(max(0.0, began + offset - time.monotonic()))
+                self.mock.add_case(
+                    f"case-{i}",
+                    f"Mock Hospital {i % 5}",
+                    f"Patient {i:03d}",
+                    f"MRN{100000 + i}",
+                    popup=rng.random() < args.popup_ratio,
+                )
+
+            deadline = time.monotonic() + args.drain_timeout
+            while time.monotonic() < deadline and self.bot.poll() is None:
+                with self.mock.changed:
+                    if all("notified" in entry for entry in self.mock.timeline.values()):
+                        break
+                time.sleep(0.2)
+            return self.mock.timeline
+        finally:
+            self.stop_bot()
+            self.mock.stop()
+
+
+def report(timeline):
+    done = sum(1 for entry in timeline.values() if "notified" in entry)
+    print(f"\n{done}/{len(timeline)} case(s) accepted and notified\n")
+    header = "".join(f"{f'p{p}':>10}" for p in PERCENTILES)
+    print(f"{'phase (ms)':<30}{'n':>5}{header}")
+    results = {}
+    for name, start, end in PHASES:
+        samples = [
+            (entry[end] - entry[start]) * 1000
+            for entry in timeline.values()
+            if start in entry and end in entry
+        ]
+        if not samples:
+            print(f"{name:<30}{0:>5}")
+            continue
+        values = {f"p{p}": round(percentile(samples, p), 1) for p in PERCENTILES}
+        results[name] = dict(values, n=len(samples))
+        print(f"{name:<30}{len(samples):>5}" + "".join(f"{v:>10.1f}" for v in values.values()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=10, help="number of cases to inject")
+    parser.add_argument("--rate", type=float, default=6, help="mean arrivals per minute")
+    parser.add_argument("--arrivals", choices=("poisson", "fixed"), default="poisson")
+    parser.add_argument("--popup-ratio", type=float, default=1.0, help="fraction of cases that also raise the popup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--drain-timeout", type=float, default=120, help="wait this long after the last case")
+    parser.add_argument("--json", help="also write the percentiles and raw timeline to this file")
+    parser.add_argument("--verbose", action="store_true", help="stream bot output instead of writing bot.log")
+    args = parser.parse_args()
+
+    timeline = Harness(args).run()
+    if timeline is None:
+        return 1
+    results = report(timeline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"percentiles": results, "timeline": timeline}, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Offline benchmark and regression check for the bot's case extraction.
+
+Replays the HTML snapshots the bot dumps into data/ (the DumpStore objects plus
+any legacy data/*.html files) and runs the same extraction code the live bot
+uses against each one: the single-round-trip case snapshot, extract_case_info,
+extract_notification_case_info, get_case_count and the Accept-button selectors.
+Pages are loaded with set_content into a context with JavaScript disabled and
+all network requests aborted, so a snapshot renders exactly as it was captured
+and no live Sevaro account is needed.
+
+For every page and function it records the median latency and the extracted
+result. Save a run as a baseline, change a selector, and compare:
+
+    python extraction_bench.py --save-baseline bench_baseline.json
+    python extraction_bench.py --baseline bench_baseline.json
+
+Any changed result is reported as a regression (exit status 1); functions that
+got noticeably slower are reported as warnings.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+from playwright.async_api import async_playwright
+
+import logs
+import sevaro_bot as bot
+from browser_host import CHROMIUM_ARGS
+from dump_store import DumpStore
+
+
+DEFAULT_REPEAT = 5
+SLOWDOWN_FACTOR = 1.5  # Report a function as slower past this ratio to the baseline...
+SLOWDOWN_MIN_MS = 2.0  # ...and only if it lost at least this many milliseconds
+
+
+async def _snapshot_fields(page):
+    snapshot = await bot.snapshot_case_state(page)
+    return {key: value for key, value in snapshot.items() if not key.endswith("_info")}
+
+
+async def _case_info(page):
+    return list(await bot.extract_case_info(page))
+
+
+async def _notification_case_info(page):
+    return list(await bot.extract_notification_case_info(page))
+
+
+BENCHMARKS = {
+    "snapshot_case_state": _snapshot_fields,
+    "extract_case_info": _case_info,
+    "extract_notification_case_info": _notification_case_info,
+    "get_case_count": bot.get_case_count,
+    "accept_button": lambda page: page.locator(bot.ACCEPT_BUTTON_SELECTOR).count(),
+    "popup_accept_button": lambda page: (
+        page.locator(bot.NOTIFICATION_POPUP_SELECTOR).locator(bot.ACCEPT_BUTTON_SELECTOR).count()
+    ),
+}
+
+
+# ---- Corpus ----
+
+def load_corpus(directory):
+    """Return [(name, label, loader)] for every stored snapshot, oldest first."""
+    corpus = []
+    seen = set()
+    store = DumpStore(directory=directory)
+    for entry in store.entries():
+        if entry["sha"] in seen:
+            continue
+        seen.add(entry["sha"])
+        name = f"{entry['label']}@{entry['sha'][:12]}"
+        corpus.append((name, entry["label"], lambda sha=entry["sha"]: store.read(sha)))
+
+    # Dumps written before the store existed: data/<timestamp>_<label>.html
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        stem = os.path.basename(path)[: -len(".html")]
+        label = stem.split("_", 1)[1] if "_" in stem else stem
+
+        def read(path=path):
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+
+        corpus.append((os.path.basename(path), label, read))
+    return corpus
+
+
+# ---- Running ----
+
+async def _block_network(route):
+    await route.abort()
+
+
+async def run_page(page, html, repeat):
+    """Load one snapshot and time every benchmark on it. Returns {function: {ms, result}}."""
+    await page.set_content(html, wait_until="domcontentloaded")
+    results = {}
+    for name, fn in BENCHMARKS.items():
+        timings = []
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = await fn(page)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {"ms": round(statistics.median(timings), 3), "result": result}
+    return results
+
+
+async def run(directory, repeat, only_label=None):
+    corpus = [item for item in load_corpus(directory) if only_label in (None, item[1])]
+    if not corpus:
+        print(f"No snapshots found in {directory}/")
+        return {}
+
+    report = {}
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        context = await browser.new_context(java_script_enabled=False)
+        await context.route("**/*", _block_network)
+        page = await context.new_page()
+        for name, label, read in corpus:
+            try:
+                report[name] = {"label": label, "functions": await run_page(page, read(), repeat)}
+            except Exception as e:
+                report[name] = {"label": label, "error": str(e)}
+        await browser.close()
+    return report
+
+
+# ---- Reporting ----
+
+def print_report(report):
+    width = max(len(name) for name in report)
+    for name, page in report.items():
+        if "error" in page:
+            print(f"{name:<{width}}  ERROR {page['error']}")
+            continue
+        functions = page["functions"]
+        info = functions["extract_case_info"]["result"]
+        popup_info = functions["extract_notification_case_info"]["result"]
+        print(
+            f"{name:<{width}}  badge={functions['get_case_count']['result']} "
+            f"accept={functions['accept_button']['result']} popup_accept={functions['popup_accept_button']['result']} "
+            f"row={info} popup={popup_info}"
+        )
+
+    print("\nLatency per function (ms, median of repeats; p50 / max across pages):")
+    for fn in BENCHMARKS:
+        samples = [page["functions"][fn]["ms"] for page in report.values() if "functions" in page]
+        if samples:
+            print(f"  {fn:<32} {statistics.median(samples):8.2f} {max(samples):8.2f}")
+
+
+def compare(report, baseline):
+    """Print differences from a baseline run. Returns the number of changed results."""
+    regressions = 0
+    for name, page in report.items():
+        before = baseline.get(name)
+        if before is None or "functions" not in page or "functions" not in before:
+            continue
+        for fn, now in page["functions"].items():
+            then = before["functions"].get(fn)
+            if then is None:
+                continue
+            if now["result"] != then["result"]:
+                regressions += 1
+                print(f"❌ {name} {fn}: {then['result']!r} -> {now['result']!r}")
+            elif now["ms"] > then["ms"] * SLOWDOWN_FACTOR and now["ms"] - then["ms"] >= SLOWDOWN_MIN_MS:
+                print(f"⚠️ {name} {fn}: {then['ms']:.2f}ms -> {now['ms']:.2f}ms")
+
+    missing = sorted(set(baseline) - set(report))
+    if missing:
+        print(f"⚠️ {len(missing)} baseline page(s) no longer in the corpus")
+    print(f"{regressions} changed result(s) against the baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=os.environ.get("DUMP_DIR", "data"), help="snapshot directory")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per function")
+    parser.add_argument("--label", help="only pages dumped under this label (e.g. new_case_detected)")
+    parser.add_argument("--baseline", help="compare against a previously saved run")
+    parser.add_argument("--save-baseline", help="write this run's results to a file")
+    args = parser.parse_args()
+    logs.setup("bench")  # Console only; the bot's own setup (log file, channel) runs in its main()
+
+    report = asyncio.run(run(args.data, args.repeat, args.label))
+    if not report:
+        return 0
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print(f"💾 Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Production server settings: `gunicorn -c gunicorn.conf.py app:app`.
+
+One worker process, because tenants, timers and bot processes live in app.py's
+memory. Many threads, because every open dashboard holds one for its /events
+stream; slow control work runs on operation lanes, not request threads.
+"""
+import os
+import signal
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3267)}"
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 32))
+# Time between SIGTERM and the master's SIGKILL. The worker first ends the /events streams
+# (see post_worker_init), then worker_exit has up to SHUTDOWN_TELEGRAM_TIMEOUT (10s) to
+# deliver the "Bot has stopped" messages.
+graceful_timeout = 15
+
+
+def worker_exit(server, worker):
+    from app import shutdown_tenants
+    shutdown_tenants()
+
+
+def post_worker_init(worker):
+    from app import prewarm_bots, stop_event_streams
+
+    # End the /events streams as soon as SIGTERM arrives, before gunicorn waits on its requests
+    handle_exit = worker.handle_exit
+
+    def on_sigterm(sig, frame):
+        stop_event_streams()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+    prewarm_bots()
@@ -0,0 +1,178 @@
+"""Structured logging shared by the supervisor and the bots.
+
+log() used to print a timestamped line synchronously from wherever it was called,
+including the bot's hot paths. Now it only builds a record and puts it on a queue;
+a listener thread does the I/O:
+
+* the console gets the same "[time] message" lines as before;
+* the supervisor appends JSON records to LOG_DIR/rescuebot.jsonl, rotated at
+  LOG_MAX_BYTES and gzip-compressed, keeping LOG_BACKUPS old files;
+* the supervisor keeps the last LOG_RING_SIZE records in memory for /logs.
+
+A bot forwards its records to the supervisor over the event channel (LOG), so they
+land in the same file and ring, labelled with the tenant. Both processes stamp
+times in LOCAL_TZ.
+
+The level defaults from the message's leading emoji (❌ error, ⚠️ warning), so
+plain log() calls need no changes; `event=` tags the records worth filtering on
+(e.g. case_accepted). Lines that name a patient pass `public=`, the text /logs
+shows instead; the console and the log file keep the full message.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from zoneinfo import ZoneInfo
+
+
+LOCAL_TZ = ZoneInfo("America/Los_Angeles")
+LOG_DIR = os.environ.get("LOG_DIR", "logs")
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.environ.get("LOG_BACKUPS", 5))
+LOG_RING_SIZE = int(os.environ.get("LOG_RING_SIZE", 2000))
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+_logger = logging.getLogger("rescuebot")
+_logger.propagate = False
+_logger.setLevel(logging.DEBUG)
+_process = None
+_listener = None
+RING = None  # RingBuffer of recent records (supervisor only)
+
+
+def _level_for(msg):
+    if msg.startswith("❌"):
+        return "error"
+    if msg.startswith("⚠️"):
+        return "warning"
+    return "info"
+
+
+def log(msg, level=None, event=None, public=None, **fields):
+    """Queue a log record; the caller never waits on I/O. Extra fields (e.g. tenant) are kept.
+    `public` replaces msg wherever the record is served over HTTP (it contains patient details)."""
+    record = {"ts": time.time(), "level": level or _level_for(msg), "process": _process, "msg": msg}
+    if event:
+        record["event"] = event
+    if public is not None:
+        record["public_msg"] = public
+    record.update(fields)
+    emit(record)
+
+
+def emit(record):
+    """Queue a record built elsewhere, e.g. one forwarded by a bot."""
+    _logger.log(LEVELS.get(record.get("level"), logging.INFO), record.get("msg", ""), extra={"record": record})
+
+
+def public_record(record):
+    """A record as /logs serves it: the public message in place of one naming a patient."""
+    record = dict(record)
+    public = record.pop("public_msg", None)
+    if public is not None:
+        record["msg"] = public
+    return record
+
+
+def _stamp(record, fmt):
+    return datetime.fromtimestamp(record["ts"], LOCAL_TZ).strftime(fmt)
+
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record):
+        return f"[{_stamp(record.record, '%Y/%m/%d %H:%M:%S %Z')}] {record.record['msg']}"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        stamped = dict(record.record, time=datetime.fromtimestamp(record.record["ts"], LOCAL_TZ).isoformat(timespec="milliseconds"))
+        return json.dumps(stamped, ensure_ascii=False, default=str)
+
+
+class RingBuffer(logging.Handler):
+    """The most recent records, for /logs."""
+
+    def __init__(self, size):
+        super().__init__()
+        self._records = deque(maxlen=size)
+
+    def emit(self, record):
+        self._records.append(record.record)
+
+    def query(self, level=None, events=None, tenant=None, limit=200):
+        """Records at or above `level`, tagged with one of `events`, for `tenant` (plus those
+        belonging to no tenant); oldest first."""
+        minimum = LEVELS.get(level, 0)
+        with self.lock:
+            records = list(self._records)
+        matches = [
+            record for record in records
+            if LEVELS.get(record.get("level"), logging.INFO) >= minimum
+            and (not events or record.get("event") in events)
+            and (tenant is None or record.get("tenant") in (tenant, None))
+        ]
+        return matches[-limit:] if limit > 0 else []
+
+
+class ForwardHandler(logging.Handler):
+    """Hand each record to `forward` (a bot's channel to the supervisor). Stops after
+    the first failed send, so a dead channel cannot feed its own error back in."""
+
+    def __init__(self, forward):
+        super().__init__()
+        self.forward = forward
+
+    def emit(self, record):
+        if self.forward and not self.forward(record.record):
+            self.forward = None
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _file_handler():
+    os.makedirs(LOG_DIR, exist_ok=True)
+    handler = RotatingFileHandler(
+        os.path.join(LOG_DIR, "rescuebot.jsonl"), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+    )
+    handler.namer = lambda name: f"{name}.gz"
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def setup(process, to_file=False, ring_size=0, forward=None):
+    """Start the listener for this process. `forward(record)` returns False once it can't deliver."""
+    global _process, _listener, RING
+    if _listener is not None:
+        return
+    _process = process
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(ConsoleFormatter())
+    # Forwarded bot records were already printed by the bot itself
+    console.addFilter(lambda record: record.record.get("process") == process)
+    handlers = [console]
+    if to_file:
+        handlers.append(_file_handler())
+    if ring_size:
+        RING = RingBuffer(ring_size)
+        handlers.append(RING)
+    if forward:
+        handlers.append(ForwardHandler(forward))
+
+    log_queue = queue.SimpleQueue()
+    _logger.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers)
+    _listener.start()
+    atexit.register(_listener.stop)  # Drain what is queued before the process exits
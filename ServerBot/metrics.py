@@ -0,0 +1,171 @@
+"""Prometheus-style metrics for the supervisor's /metrics endpoint.
+
+The bot process does the timing and ships each observation to the supervisor
+over the event channel (a METRIC event with a name, value and labels). The
+supervisor records it here, labelled with the tenant, and renders everything in
+the Prometheus text exposition format. Only the metrics declared in METRICS are
+accepted, so a typo in the bot cannot create a new series.
+"""
+import os
+import threading
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STARTUP_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "sevaro_bot_loop_iteration_seconds": (
+        "histogram", "Time spent on one bot_loop pass, excluding the wait for the next change.", LATENCY_BUCKETS),
+    "sevaro_refresh_dashboard_seconds": (
+        "histogram", "Duration of the away-and-back dashboard refresh.", LATENCY_BUCKETS),
+    "sevaro_dashboard_probes_total": (
+        "counter", "Case-list API probes by outcome (agree, disagree, unavailable).", None),
+    "sevaro_page_wait_seconds": (
+        "histogram", "Condition waits in the page (dashboard refresh, case info, Synapse relaunch) by outcome.", LATENCY_BUCKETS),
+    "sevaro_handle_new_case_seconds": (
+        "histogram", "handle_new_case duration by result, excluding the acknowledge wait.", LATENCY_BUCKETS),
+    "sevaro_detection_to_click_seconds": (
+        "histogram", "From the bot seeing pending cases to clicking Accept.", LATENCY_BUCKETS),
+    "sevaro_acknowledge_wait_seconds": (
+        "histogram", "From accepting a case to the user acknowledging it.", STARTUP_BUCKETS),
+    "sevaro_startup_phase_seconds": (
+        "histogram", "Bot startup phases (browser launch, login or session resume, synapse).", STARTUP_BUCKETS),
+    "sevaro_telegram_send_seconds": (
+        "histogram", "Telegram delivery time including retries, by sending process.", LATENCY_BUCKETS),
+    "sevaro_telegram_failures_total": (
+        "counter", "Telegram messages that could not be delivered.", None),
+    "sevaro_cases_total": (
+        "counter", "handle_new_case outcomes (accepted, failed, not_credentialed, broken).", None),
+    "sevaro_bot_running": (
+        "gauge", "1 while the tenant's bot process is running.", None),
+    "sevaro_chromium_rss_bytes": (
+        "gauge", "Resident memory of the Chromium processes serving a tenant (or the shared browser).", None),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self, definitions=METRICS):
+        self.definitions = definitions
+        self._lock = threading.Lock()
+        self._series = {name: {} for name in definitions}  # name -> {label tuple: value or histogram}
+
+    def record(self, name, value, labels=None):
+        """Observe a histogram, add to a counter or set a gauge. Returns False for unknown metrics."""
+        definition = self.definitions.get(name)
+        if definition is None:
+            return False
+        kind, _, buckets = definition
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            series = self._series[name]
+            if kind == "histogram":
+                histogram = series.setdefault(key, [[0] * len(buckets), 0.0, 0])  # bucket counts, sum, count
+                for i, bound in enumerate(buckets):
+                    if value <= bound:
+                        histogram[0][i] += 1
+                histogram[1] += value
+                histogram[2] += 1
+            elif kind == "counter":
+                series[key] = series.get(key, 0) + value
+            else:
+                series[key] = value
+        return True
+
+    def clear(self, name, **labels):
+        """Drop every series of `name` whose labels include `labels` (e.g. a stopped tenant's gauge)."""
+        with self._lock:
+            series = self._series[name]
+            for key in [k for k in series if set(labels.items()) <= set(k)]:
+                del series[key]
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in self.definitions.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(self._series[name].items()):
+                    if kind == "histogram":
+                        counts, total, count = value
+                        for bound, bucket_count in zip(buckets, counts):
+                            le = key + (("le", _format_value(float(bound))),)
+                            lines.append(f"{name}_bucket{_format_labels(le)} {bucket_count}")
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                        lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                        lines.append(f"{name}_count{_format_labels(key)} {count}")
+                    else:
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ---- Chromium memory ----
+
+def _read_proc(pid, name):
+    with open(f"/proc/{pid}/{name}", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _parse_stat(stat):
+    """(comm, ppid) from /proc/<pid>/stat. comm may contain spaces; fields after the closing paren are fixed."""
+    comm = stat[stat.index("(") + 1: stat.rindex(")")]
+    ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+    return comm, ppid
+
+
+def chromium_rss_bytes(root_pid):
+    """Total RSS of the Chromium processes descended from `root_pid` (a bot, or the browser
+    host). Playwright launches Chromium detached, in its own process group, so the tree is
+    followed through parent pids. Returns None where /proc is unavailable."""
+    try:
+        pids = [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    parents, names = {}, {}
+    for pid in pids:
+        try:
+            names[pid], parents[pid] = _parse_stat(_read_proc(pid, "stat"))
+        except (OSError, ValueError):
+            continue
+
+    def descends_from_root(pid):
+        seen = set()
+        while pid in parents and pid not in seen:
+            seen.add(pid)
+            pid = parents[pid]
+            if pid == root_pid:
+                return True
+        return False
+
+    total = 0
+    for pid, comm in names.items():
+        is_chromium = "chrom" in comm.lower() or "headless_shell" in comm
+        if not is_chromium or not descends_from_root(pid):
+            continue
+        try:
+            for line in _read_proc(pid, "status").splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+                    break
+        except (OSError, ValueError):
+            continue
+    return total
@@ -0,0 +1,274 @@
+"""Local stand-ins for Okta, the Synapse rescue dashboard and the Telegram API.
+
+Used by e2e_bench.py to run the real bot without a network or a Sevaro account.
+One Flask app serves all three:
+
+    /, /login/*, /app/UserHome   Okta-style login (identifier, password, TOTP) and app home
+    /synapse                     Rescue dashboard SPA using the live selectors (badge,
+                                 div.complete-row, notification popup, Accept buttons)
+    /api/rescue/cases            Pending cases as JSON, refetched by the SPA on every push
+    /bot<token>/sendMessage      Telegram Bot API sendMessage
+    /ip                          Egress IP check
+
+Cases are injected with add_case(). The SPA reports when it rendered each case and
+when its Accept button was clicked, so together with the Telegram log every case
+gets a timeline (see MockSevaro.timeline).
+"""
+import threading
+import time
+
+from flask import Flask, Response, jsonify, redirect, render_template_string, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+STREAM_KEEPALIVE_SECONDS = 15
+
+LOGIN_STEP_HTML = """<!DOCTYPE html>
+<html><head><title>Sign In</title></head>
+<body>
+<form method="post" action="{{ action }}">
+    <input {{ field | safe }} autofocus>
+    <input class="button button-primary" type="submit" value="{{ button }}">
+</form>
+</body></html>
+"""
+
+HOME_HTML = """<!DOCTYPE html>
+<html><head><title>My Apps</title></head>
+<body>
+<div class="app-card">
+    <div data-se="app-card-title" title="Synapse 2.0">Synapse 2.0</div>
+    <button aria-label="Settings for Synapse 2.0" onclick="document.getElementById('launch').style.display='inline'">⋮</button>
+    <a id="launch" data-se="app-settings-launch-app-button" href="/synapse" target="_blank" style="display:none">Launch App</a>
+</div>
+</body></html>
+"""
+
+SYNAPSE_HTML = """<!DOCTYPE html>
+<html><head><title>Synapse</title>
+<style>
+    .rescue-notification-container { position: fixed; top: 10px; right: 10px; border: 1px solid #c00; padding: 10px; background: #fff; }
+    .complete-row { border-bottom: 1px solid #ccc; padding: 4px; }
+</style>
+</head>
+<body>
+<ul class="sidebar">
+    <li class="waitingRoom"><a href="#">Waiting Room</a></li>
+    <li class="rescue-dashboard-container"><a class="nav-link" href="#">Rescue Dashboard</a> <span class="rescue-dashboard-count"></span></li>
+</ul>
+<main id="main"></main>
+<div id="popup"></div>
+<script>
+let view = "waiting";
+let cases = [];
+const reported = new Set();
+
+const post = (path, body) => fetch(path, {
+    method: "POST", keepalive: true,
+    headers: {"Content-Type": "application/json"}, body: JSON.stringify(body),
+});
+const el = (tag, attrs, children) => {
+    const node = document.createElement(tag);
+    Object.entries(attrs || {}).forEach(([k, v]) => node.setAttribute(k, v));
+    (children || []).forEach((c) => node.append(c));
+    return node;
+};
+const acceptButton = (c) => {
+    const button = el("button", {}, ["Accept"]);
+    button.addEventListener("click", () => {
+        post("/mock/accept", {id: c.rescueId, t: Date.now()});
+        cases = cases.filter((other) => other.rescueId !== c.rescueId);
+        render();
+    });
+    return button;
+};
+
+function render() {
+    document.querySelector(".rescue-dashboard-count").textContent = cases.length ? String(cases.length) : "";
+
+    const main = document.getElementById("main");
+    main.replaceChildren();
+    if (view === "rescue") {
+        const dashboard = el("app-rescue-dashboard");
+        cases.forEach((c) => dashboard.append(el("div", {"class": "complete-row", "data-id": c.rescueId}, [
+            el("div", {"class": "facility-name"}, [el("div", {}, [c.facilityName])]),
+            el("div", {"data-dd-action-name": "rescue-dashboard-patient-name"}, [
+                el("span", {"data-dd-privacy": "mask"}, [el("span", {"apptruncatepopover": ""}, [c.patientName])]),
+            ]),
+            el("span", {"data-dd-action-name": "rescue-dashboard-mrn"}, [c.mrn]),
+            acceptButton(c),
+        ])));
+        main.append(dashboard);
+    } else {
+        main.append(el("app-waiting-room", {}, ["Waiting room"]));
+    }
+
+    const popup = document.getElementById("popup");
+    popup.replaceChildren();
+    const notify = cases.find((c) => c.popup);
+    if (notify) {
+        popup.append(el("div", {"class": "rescue-notification-container"}, [
+            el("span", {"data-dd-action-name": "rescue-notification-facility-name"}, [notify.facilityName]),
+            el("span", {"data-dd-action-name": "rescue-notification-patient-name"}, [notify.patientName]),
+            el("span", {"data-dd-action-name": "rescue-notification-patient-mrn"}, [notify.mrn]),
+            acceptButton(notify),
+        ]));
+    }
+
+    // Report first render of each case; only the rescue view or popup makes it visible to the bot
+    const visible = view === "rescue" ? cases : cases.filter((c) => c.popup);
+    const fresh = visible.map((c) => c.rescueId).filter((id) => !reported.has(id));
+    if (fresh.length) {
+        fresh.forEach((id) => reported.add(id));
+        post("/mock/rendered", {ids: fresh, t: Date.now()});
+    }
+}
+
+async function refresh() {
+    const response = await fetch("/api/rescue/cases");
+    cases = await response.json();
+    render();
+}
+
+document.querySelector(".waitingRoom a").addEventListener("click", (e) => { e.preventDefault(); view = "waiting"; render(); });
+document.querySelector(".rescue-dashboard-container a").addEventListener("click", (e) => { e.preventDefault(); view = "rescue"; refresh(); });
+new EventSource("/mock/stream").onmessage = refresh;
+refresh();
+</script>
+</body></html>
+"""
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class MockSevaro:
+    def __init__(self, on_message=None):
+        self.on_message = on_message  # Called with each Telegram message text
+        self.changed = threading.Condition()
+        self.version = 0
+        self.pending = {}    # rescueId -> case payload
+        self.timeline = {}   # rescueId -> {"mrn", "injected", "rendered", "clicked", "notified"}
+        self.messages = []   # (received_at, text)
+        self.app = self._build_app()
+        self._server = None
+
+    # ---- Harness side ----
+
+    def add_case(self, rescue_id, hospital, patient, mrn, popup=True):
+        case = {"rescueId": rescue_id, "facilityName": hospital, "patientName": patient, "mrn": mrn, "popup": popup}
+        with self.changed:
+            self.pending[rescue_id] = case
+            self.timeline[rescue_id] = {"mrn": mrn, "injected": time.time()}
+            self._bump()
+
+    def serve(self, host="127.0.0.1", port=0):
+        """Start serving on a background thread. Returns the base URL."""
+        self._server = make_server(host, port, self.app, threaded=True, request_handler=_QuietRequestHandler)
+        threading.Thread(target=self._server.serve_forever, name="mock-sevaro", daemon=True).start()
+        return f"http://{host}:{self._server.server_port}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+
+    # ---- Internals ----
+
+    def _bump(self):
+        """Must hold self.changed."""
+        self.version += 1
+        self.changed.notify_all()
+
+    def _stream(self):
+        seen = -1
+        while True:
+            with self.changed:
+                if self.version == seen:
+                    self.changed.wait(STREAM_KEEPALIVE_SECONDS)
+                if self.version == seen:
+                    yield ": keepalive\n\n"
+                    continue
+                seen = self.version
+            yield f"data: {seen}\n\n"
+
+    def _record_message(self, text):
+        received_at = time.time()
+        with self.changed:
+            self.messages.append((received_at, text))
+            for entry in self.timeline.values():
+                if "notified" not in entry and entry["mrn"] in text:
+                    entry["notified"] = received_at
+        if self.on_message:
+            self.on_message(text)
+
+    def _build_app(self):
+        app = Flask(__name__)
+
+        @app.route("/")
+        def login():
+            return render_template_string(LOGIN_STEP_HTML, action="/login/password", field='type="text" name="identifier"', button="Next")
+
+        @app.route("/login/password", methods=["POST"])
+        def login_password():
+            return render_template_string(LOGIN_STEP_HTML, action="/login/otp", field='type="password" name="password"', button="Verify")
+
+        @app.route("/login/otp", methods=["POST"])
+        def login_otp():
+            return render_template_string(LOGIN_STEP_HTML, action="/login/done", field='type="text" name="credentials.passcode"', button="Verify")
+
+        @app.route("/login/done", methods=["POST"])
+        def login_done():
+            return redirect("/app/UserHome")
+
+        @app.route("/app/UserHome")
+        def home():
+            return HOME_HTML
+
+        @app.route("/synapse")
+        def synapse():
+            return SYNAPSE_HTML
+
+        @app.route("/api/rescue/cases")
+        def cases():
+            with self.changed:
+                return jsonify(list(self.pending.values()))
+
+        @app.route("/mock/stream")
+        def stream():
+            return Response(self._stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+        @app.route("/mock/rendered", methods=["POST"])
+        def rendered():
+            data = request.get_json(force=True)
+            with self.changed:
+                for rescue_id in data["ids"]:
+                    entry = self.timeline.get(rescue_id)
+                    # Several tabs (e.g. the standby) may render the same case; keep the first
+                    if entry is not None and "rendered" not in entry:
+                        entry["rendered"] = data["t"] / 1000
+            return "", 204
+
+        @app.route("/mock/accept", methods=["POST"])
+        def accept():
+            data = request.get_json(force=True)
+            with self.changed:
+                entry = self.timeline.get(data["id"])
+                if entry is not None and "clicked" not in entry:
+                    entry["clicked"] = data["t"] / 1000
+                self.pending.pop(data["id"], None)
+                self._bump()
+            return "", 204
+
+        @app.route("/bot<token>/sendMessage", methods=["POST"])
+        def send_message(token):
+            payload = request.get_json(silent=True) or request.form
+            self._record_message(payload.get("text", ""))
+            return jsonify({"ok": True, "result": {}})
+
+        @app.route("/ip")
+        def ip():
+            return "127.0.0.1"
+
+        return app
@@ -0,0 +1,161 @@
+"""Non-blocking Telegram notifier shared by app.py and sevaro_bot.py.
+
+Messages are queued and delivered by a background thread over one keep-alive
+HTTPS session, so callers never wait on Telegram. Identical messages that are
+still waiting in the queue are coalesced into a single send. Rate limits (429)
+are retried after Telegram's `retry_after`, other transient errors with a short
+backoff. The result is reported through a completion callback `on_done(ok)`,
+which is how callers keep the "die if delivery ultimately fails" rule.
+An optional `on_delivery(ok, seconds)` hook sees every send's outcome and latency.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+SEND_TIMEOUT_SECONDS = 10
+MAX_ATTEMPTS = 3
+MAX_RETRY_AFTER_SECONDS = 60
+
+
+class TelegramNotifier:
+    def __init__(self, token, chat_id, log, on_delivery=None):
+        self.token = token
+        self.chat_id = chat_id
+        self.log = log
+        self.on_delivery = on_delivery
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._pending = deque()  # [msg, callbacks] in send order
+        self._by_msg = {}        # msg -> its pending entry, for coalescing
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return bool(self.token and self.chat_id)
+
+    def send(self, msg, on_done=None):
+        """Queue `msg` for delivery and return immediately.
+        `on_done(ok)` is called from the sender thread once delivery succeeds or finally fails."""
+        if not self.enabled:
+            self.log(f"Telegram disabled (missing token/chat id): {msg}", public=f"Telegram disabled (missing token/chat id): {_headline(msg)}")
+            if on_done:
+                on_done(False)
+            return
+
+        self.log(f"📤 Sending Telegram: {msg}", public=f"📤 Sending Telegram: {_headline(msg)}")
+        with self._cond:
+            entry = self._by_msg.get(msg)
+            if entry is None:
+                entry = [msg, []]
+                self._by_msg[msg] = entry
+                self._pending.append(entry)
+            else:
+                self.log("📎 Coalesced with an identical queued Telegram message")
+            if on_done:
+                entry[1].append(on_done)
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been handled. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Deliver what is queued (up to `timeout`), then stop the sender thread."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._session.close()
+        return flushed
+
+    # ---- Sender thread ----
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                msg, callbacks = self._pending.popleft()
+                del self._by_msg[msg]
+                self._busy = True
+
+            started = time.monotonic()
+            ok = self._deliver(msg)
+            if self.on_delivery:
+                try:
+                    self.on_delivery(ok, time.monotonic() - started)
+                except Exception as e:
+                    self.log(f"⚠️ Telegram delivery hook failed: {e}")
+            for callback in callbacks:
+                try:
+                    callback(ok)
+                except Exception as e:
+                    self.log(f"⚠️ Telegram completion callback failed: {e}")
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _deliver(self, msg):
+        url = f"{TELEGRAM_API_URL}/bot{self.token}/sendMessage"
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            delay = attempt
+            try:
+                r = self._session.post(
+                    url,
+                    data={"chat_id": self.chat_id, "text": msg},
+                    timeout=SEND_TIMEOUT_SECONDS,
+                )
+                if r.ok:
+                    self.log(f"📱 Telegram sent:\n{msg}", public=f"📱 Telegram sent: {_headline(msg)}")
+                    return True
+                self.log(f"Telegram failed ({r.status_code}): {r.text}")
+                if r.status_code == 429:
+                    delay = _retry_after(r)
+                elif r.status_code < 500:
+                    return False
+            except requests.RequestException as e:
+                self.log(f"Telegram error: {e}")
+
+            if attempt < MAX_ATTEMPTS:
+                self.log(f"🔁 Retrying Telegram in {delay}s (attempt {attempt + 1}/{MAX_ATTEMPTS})")
+                time.sleep(delay)
+        return False
+
+
+def _retry_after(response):
+    try:
+        retry_after = int(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        retry_after = 1
+    return min(max(retry_after, 1), MAX_RETRY_AFTER_SECONDS)
+
+
+def _headline(msg):
+    """First line of a message: what /logs shows, since case messages list the patient below it."""
+    return msg.split("\n", 1)[0]
@@ -0,0 +1,81 @@
+"""Background control operations for the supervisor's routes.
+
+Start, Stop, Refresh and Acknowledge can take seconds (launching the shared
+browser, waiting for a bot to exit). The routes hand that work to Operations and
+answer at once with an operation id. Each user gets their own lane: a worker
+thread that runs that user's operations one at a time, in the order they were
+requested, so a slow Stop for one user never holds up anyone else.
+
+The most recent operations are kept in memory so the UI can poll
+/operations/<id> or pick them up from /events.
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+MAX_OPERATIONS = 200
+
+
+class Operations:
+    def __init__(self, log, on_change):
+        self.log = log
+        self.on_change = on_change  # Called whenever an operation changes state
+        self._lock = threading.Lock()
+        self._ops = OrderedDict()  # id -> operation record, oldest first
+        self._lanes = {}           # lane -> queue of (record, fn)
+
+    def submit(self, lane, kind, fn):
+        """Queue `fn()` on `lane` (one per user) and return a copy of its record.
+        The record's `result` is what fn returns; an exception marks it failed."""
+        op = {
+            "id": uuid.uuid4().hex[:12],
+            "tenant": lane,
+            "kind": kind,
+            "state": "queued",
+            "result": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._ops[op["id"]] = op
+            while len(self._ops) > MAX_OPERATIONS:
+                self._ops.popitem(last=False)
+            lane_queue = self._lanes.get(lane)
+            if lane_queue is None:
+                lane_queue = self._lanes[lane] = queue.Queue()
+                threading.Thread(target=self._run_lane, args=(lane_queue,), name=f"ops-{lane}", daemon=True).start()
+            lane_queue.put((op, fn))
+            snapshot = dict(op)
+        self.on_change()
+        return snapshot
+
+    def get(self, op_id):
+        with self._lock:
+            op = self._ops.get(op_id)
+            return dict(op) if op else None
+
+    def recent(self, lane, limit=5):
+        """The lane's latest operations, newest first."""
+        with self._lock:
+            ops = [dict(op) for op in reversed(self._ops.values()) if op["tenant"] == lane]
+        return ops[:limit]
+
+    def _run_lane(self, lane_queue):
+        while True:
+            op, fn = lane_queue.get()
+            self._update(op, state="running")
+            try:
+                result = fn()
+                self._update(op, state="done", result=result, finished_at=time.time())
+            except Exception as e:
+                self.log(f"⚠️ {op['kind']} failed: {e}", event="operation_failed")
+                self._update(op, state="failed", error=str(e), finished_at=time.time())
+
+    def _update(self, op, **fields):
+        with self._lock:
+            op.update(fields)
+        self.on_change()
@@ -0,0 +1,67 @@
+"""Condition-based waits for the Synapse pages, each with a deadline and a timing.
+
+The bot used to sleep a fixed 1-3 seconds after clicks and retries, paying the
+full delay whether or not the page was ready. Each wait here names the condition
+it is for (an element reaching a state, a predicate evaluated in the page, or a
+network response), returns as soon as that holds, and gives up at its deadline.
+Every wait is reported with its name, duration and outcome, so the deadlines can
+be tuned from /metrics.
+"""
+import time
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+
+class Deadline:
+    """A time budget shared by several waits in one phase (e.g. handle_new_case's 20 seconds)."""
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() == 0
+
+
+def _timeout_ms(timeout):
+    """Playwright treats 0 as "no timeout"; an exhausted deadline should fail at once instead."""
+    return max(1, round(timeout * 1000))
+
+
+class PageWaits:
+    def __init__(self, log, on_wait=None):
+        self.log = log
+        self.on_wait = on_wait  # Called with (name, seconds, met) after every wait
+
+    async def locator(self, name, locator, timeout, state="visible"):
+        """Wait for `locator` to reach `state`. Returns False if the deadline passed first."""
+        return await self._timed(name, timeout, locator.wait_for(state=state, timeout=_timeout_ms(timeout)))
+
+    async def function(self, name, page, expression, arg=None, timeout=5):
+        """Wait for a JS predicate to hold in the page (re-checked every animation frame)."""
+        return await self._timed(name, timeout, page.wait_for_function(expression, arg=arg, timeout=_timeout_ms(timeout)))
+
+    async def response(self, name, page, matches, action, timeout):
+        """Run `action()` (e.g. a click) and wait for the response it triggers that `matches`."""
+        async def expect():
+            async with page.expect_response(matches, timeout=_timeout_ms(timeout)) as response_info:
+                await action()
+            await response_info.value
+        return await self._timed(name, timeout, expect())
+
+    async def _timed(self, name, timeout, waiting):
+        started = time.monotonic()
+        try:
+            await waiting
+            met = True
+        except PlaywrightTimeoutError:
+            met = False
+        elapsed = time.monotonic() - started
+        if not met:
+            self.log(f"⌛ Gave up waiting for {name} after {elapsed:.1f}s (deadline {timeout:.1f}s)")
+        if self.on_wait:
+            self.on_wait(name, elapsed, met)
+        return met
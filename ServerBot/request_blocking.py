@@ -0,0 +1,107 @@
+"""Request blocking profile for the bot's browser context.
+
+The bot only reads text and clicks buttons, so images, fonts, media and the
+Synapse SPA's Datadog RUM telemetry are pure overhead for the long-running
+headless Chromium. RequestBlocker aborts those requests through context.route
+and counts what it blocked per category.
+
+Only URLs that can be blocked are routed (the matcher is a regex that Playwright
+evaluates on the driver side), so ordinary API and document traffic never makes
+a round-trip through Python. Resource types are matched by file extension for
+routing and then confirmed against the request's actual resource type.
+
+Configuration (comma-separated, URL patterns are fnmatch-style globs):
+    REQUEST_BLOCKING=0          disable entirely
+    BLOCK_RESOURCE_TYPES        resource types to block (image, font, media)
+    BLOCK_URL_PATTERNS          URLs to block regardless of type
+    ALLOW_URL_PATTERNS          URLs never blocked (wins over both lists)
+"""
+import os
+import re
+from collections import Counter
+from fnmatch import fnmatch
+
+
+DEFAULT_BLOCKED_RESOURCE_TYPES = "image,font,media"
+DEFAULT_BLOCKED_URL_PATTERNS = ",".join((
+    "*datadoghq.com/*",
+    "*datadoghq-browser-agent.com/*",
+    "*browser-intake-*",
+    "*google-analytics.com/*",
+    "*googletagmanager.com/*",
+))
+
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp3", "mp4", "m4a", "webm", "ogg", "wav"),
+}
+
+
+def _split(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _glob_to_regex(pattern):
+    """Translate a glob into a regex source that is valid in both Python and JavaScript."""
+    return "".join(".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in pattern)
+
+
+class RequestBlocker:
+    def __init__(self, resource_types=(), deny_patterns=(), allow_patterns=()):
+        self.resource_types = set(resource_types)
+        self.deny_patterns = list(deny_patterns)
+        self.allow_patterns = list(allow_patterns)
+        self.counts = Counter()  # category -> blocked requests
+        self.passed = 0          # routed but let through (allow-listed or type mismatch)
+
+    @classmethod
+    def from_env(cls):
+        """Build the profile from the environment, or return None when blocking is disabled."""
+        if os.environ.get("REQUEST_BLOCKING", "1") != "1":
+            return None
+        return cls(
+            resource_types=_split(os.environ.get("BLOCK_RESOURCE_TYPES", DEFAULT_BLOCKED_RESOURCE_TYPES)),
+            deny_patterns=_split(os.environ.get("BLOCK_URL_PATTERNS", DEFAULT_BLOCKED_URL_PATTERNS)),
+            allow_patterns=_split(os.environ.get("ALLOW_URL_PATTERNS", "")),
+        )
+
+    def classify(self, url, resource_type):
+        """Return the category a request is blocked under, or None to let it through."""
+        url = url.lower()
+        if any(fnmatch(url, pattern.lower()) for pattern in self.allow_patterns):
+            return None
+        for pattern in self.deny_patterns:
+            if fnmatch(url, pattern.lower()):
+                return f"url:{pattern}"
+        if resource_type in self.resource_types:
+            return f"type:{resource_type}"
+        return None
+
+    def route_pattern(self):
+        """Regex of every URL that might be blocked, or None if nothing can be."""
+        alternatives = [f"^{_glob_to_regex(p)}$" for p in self.deny_patterns]
+        extensions = [ext for t in sorted(self.resource_types) for ext in RESOURCE_TYPE_EXTENSIONS.get(t, ())]
+        if extensions:
+            alternatives.append(r"^[^?#]*\.(" + "|".join(extensions) + r")([?#].*)?$")
+        if not alternatives:
+            return None
+        return re.compile("|".join(f"(?:{a})" for a in alternatives), re.IGNORECASE)
+
+    async def install(self, context):
+        pattern = self.route_pattern()
+        if pattern is not None:
+            await context.route(pattern, self._handle)
+
+    def summary(self):
+        return dict(self.counts)
+
+    async def _handle(self, route):
+        request = route.request
+        category = self.classify(request.url, request.resource_type)
+        if category is None:
+            self.passed += 1
+            await route.fallback()
+            return
+        self.counts[category] += 1
+        await route.abort("blockedbyclient")
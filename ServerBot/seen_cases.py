@@ -0,0 +1,90 @@
+"""Cases the bot has already checked and found it cannot accept.
+
+handle_new_case waits up to 20 seconds for an Accept button before concluding the
+user is not credentialed for a case. Without a memory of that verdict, every
+bot_loop pass re-runs the wait while the case sits on the dashboard, and the bot
+is blind to new cases the whole time. SeenCaseCache remembers each verdict for a
+TTL, keyed by MRN (or by hospital and patient when the MRN is missing), so known
+cases are skipped at once. Entries expire so a case is re-checked eventually, in
+case the user's credentials or the case's routing change.
+"""
+import os
+import threading
+import time
+
+
+SEEN_CASE_TTL_SECONDS = float(os.environ.get("SEEN_CASE_TTL_SECONDS", 15 * 60))
+
+
+def case_key(info):
+    """Identity of a dashboard row or popup, or None when it has nothing to go on."""
+    if info.get("patient_id"):
+        return f"mrn:{info['patient_id']}"
+    if info.get("hospital") and info.get("patient"):
+        return f"row:{info['hospital']}|{info['patient']}"
+    return None
+
+
+class SeenCaseCache:
+    def __init__(self, ttl=SEEN_CASE_TTL_SECONDS, on_change=None):
+        self.ttl = ttl
+        self.on_change = on_change  # Called with entries() whenever the set of cases changes
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> {"hospital", "patient", "patient_id", "seen_at", "expires_at"}
+
+    def add(self, info, now=None):
+        """Remember a case as not credentialed. Returns True only when the case was not
+        already remembered (or its entry had expired); False if it has no usable key."""
+        key = case_key(info)
+        if key is None:
+            return False
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            is_new = entry is None or entry["expires_at"] <= now
+            self._entries[key] = {
+                "hospital": info.get("hospital"),
+                "patient": info.get("patient"),
+                "patient_id": info.get("patient_id"),
+                "seen_at": now if is_new else entry["seen_at"],
+                "expires_at": now + self.ttl,
+            }
+        if is_new:
+            self._changed()
+        return is_new
+
+    def contains(self, info, now=None):
+        key = case_key(info)
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry["expires_at"] > now
+
+    def prune(self, now=None):
+        """Drop expired cases."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+            for key in expired:
+                del self._entries[key]
+        if expired:
+            self._changed()
+
+    def clear(self):
+        with self._lock:
+            had_entries = bool(self._entries)
+            self._entries.clear()
+        if had_entries:
+            self._changed()
+
+    def entries(self):
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda entry: entry["seen_at"])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self.entries())
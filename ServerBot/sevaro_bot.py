@@ -1,27 +1,73 @@
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+import asyncio
 import requests
 import signal
+import threading
 import time
 import os
 import sys
 import json
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
 
-from zoneinfo import ZoneInfo
-
-sys.stdout.reconfigure(line_buffering=True)
+import channel
+import logs
+from accept_agent import AcceptAgent
+from browser_host import open_browser
+from cadence import PollCadence
+from case_feed import CaseFeed
+from dump_store import DumpStore
+from logs import LOCAL_TZ, log
+from notifier import TelegramNotifier
+from page_waits import Deadline, PageWaits
+from request_blocking import RequestBlocker
+from seen_cases import SeenCaseCache
+
+CHANNEL = channel.EventChannel.from_env(log)  # To the supervisor; None when run standalone
+
+# ---- Runtime ----
+# The bot runs as asyncio tasks on one event loop: the page watcher (bot_loop), the
+# acknowledge handler (acknowledge_loop), the standby tab builder (SynapseTabs.keep_standby)
+# and the watchdog (watchdog_loop). Telegram
+# delivery has its own queue and sender thread (notifier.py). The tasks share state
+# through the events and the queue below instead of blocking one another.
+
+LOOP = None
+SHUTDOWN = asyncio.Event()       # Set once when the bot should stop
+WAKEUP = asyncio.Event()         # Set when the watcher should look at the page again
+ACKNOWLEDGED = asyncio.Event()
+ACCEPTED_CASES = asyncio.Queue()  # Accepted cases for acknowledge_loop
+PENDING_ACK = None               # (hospital, patient, patient_id) awaiting acknowledge; blocks accepting
+EXIT_CODE = 0
+SHUTDOWN_GRACE_SECONDS = 10      # How long the watcher gets to wind down before it is cancelled
+WATCHDOG_INTERVAL_SECONDS = 1
+
+
+def call_in_loop(callback, *args):
+    """Run `callback` on the event loop. For handlers that fire on the channel and notifier threads."""
+    try:
+        LOOP.call_soon_threadsafe(callback, *args)
+    except (AttributeError, RuntimeError):
+        pass  # Loop not started yet or already closed
 
 
-LOCAL_TZ = ZoneInfo("America/Los_Angeles")
+async def wait_first(*aws, timeout=None):
+    """Wait until the first of `aws` finishes or `timeout` passes, cancelling the rest.
+    Returns True unless it timed out."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        return bool(done)
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
-def log(msg):
-    """Print with timestamp."""
-    timestamp = datetime.now(LOCAL_TZ).strftime("%Y/%m/%d %H:%M:%S %Z")
-    print(f"[{timestamp}] {msg}", flush=True)
+def request_shutdown():
+    """Ask every task to stop. Must run on the event loop."""
+    SHUTDOWN.set()
+    WAKEUP.set()
 
-# Global flag for graceful shutdown
-SHUTDOWN_REQUESTED = False
 
 # FAILSAFE: Hard max runtime (timer duration + 5 min buffer)
 TIMER_DURATION = int(os.environ.get("TIMER_DURATION", 60 * 60))  # Default 1 hour
@@ -31,39 +77,66 @@ BOT_START_TIME = time.time()
 
 def check_hard_timeout():
     """Failsafe: Gracefully stop bot if it's been running too long (backup for timer)."""
-    global SHUTDOWN_REQUESTED
     elapsed = time.time() - BOT_START_TIME
-    if elapsed > MAX_RUNTIME_SECONDS:
+    if elapsed > MAX_RUNTIME_SECONDS and not SHUTDOWN.is_set():
         log(f"⛔ FAILSAFE: Bot exceeded max runtime ({MAX_RUNTIME_SECONDS}s). Shutting down gracefully.")
-        SHUTDOWN_REQUESTED = True
+        request_shutdown()
 
 
-def handle_shutdown(signum, frame):
+def handle_shutdown(signum):
     """Handle SIGTERM/SIGINT for graceful shutdown."""
-    global SHUTDOWN_REQUESTED
     log(f"🛑 Received signal {signum}, shutting down gracefully...")
-    SHUTDOWN_REQUESTED = True
+    request_shutdown()
 
 
-def handle_timer_reset(signum, frame):
-    """Handle SIGUSR1 to reset failsafe timer."""
+def reset_failsafe_timer():
     global BOT_START_TIME
     BOT_START_TIME = time.time()
     log("🔄 Failsafe timer reset.")
 
 
-signal.signal(signal.SIGTERM, handle_shutdown)
-signal.signal(signal.SIGINT, handle_shutdown)
-signal.signal(signal.SIGUSR1, handle_timer_reset)
+def install_signal_handlers():
+    """SIGTERM/SIGINT stop the bot, SIGUSR1 resets the failsafe timer."""
+    LOOP.add_signal_handler(signal.SIGTERM, handle_shutdown, signal.SIGTERM)
+    LOOP.add_signal_handler(signal.SIGINT, handle_shutdown, signal.SIGINT)
+    LOOP.add_signal_handler(signal.SIGUSR1, reset_failsafe_timer)
 
-CASE_ACCEPTED_FILE = "case_accepted.json"
-CASE_ACKNOWLEDGED_FILE = "case_acknowledged"
-LOGIN_URL = "https://login.mysevaro.com"
-HOME_URL = "https://login.mysevaro.com/app/UserHome"
+LOGIN_URL = os.environ.get("SEVARO_LOGIN_URL", "https://login.mysevaro.com")
+HOME_URL = f"{LOGIN_URL}/app/UserHome"
 RESCUE_SELECTOR = "li.rescue-dashboard-container a.nav-link"
 SYNAPSE_SELECTOR = '[data-se="app-card-title"][title="Synapse 2.0"]'
 NOTIFICATION_POPUP_SELECTOR = "div.rescue-notification-container"
-
+CASE_ROW_SELECTOR = "div.complete-row"
+CASE_COUNT_BADGE_SELECTOR = "li.rescue-dashboard-container .rescue-dashboard-count"
+ACCEPT_BUTTON_SELECTOR = 'button:has-text("Accept")'
+
+# "observer" reacts to DOM changes pushed from the page; "poll" is the legacy 2s loop.
+DETECTION_MODE = os.environ.get("DETECTION_MODE", "observer")
+# In observer mode, still do a full dashboard refresh as a safety net: every SAFETY_POLL_SECONDS
+# around recent cases and busy hours, backing off to SAFETY_POLL_MAX_SECONDS when quiet.
+SAFETY_POLL_SECONDS = float(os.environ.get("SAFETY_POLL_SECONDS", 30))
+SAFETY_POLL_MAX_SECONDS = float(os.environ.get("SAFETY_POLL_MAX_SECONDS", 120))
+# Poll mode interval bounds (the legacy loop used a fixed 2s).
+POLL_MIN_SECONDS = float(os.environ.get("POLL_MIN_SECONDS", 1))
+POLL_MAX_SECONDS = float(os.environ.get("POLL_MAX_SECONDS", 10))
+# Decode case info from the dashboard's API/WebSocket traffic before it renders.
+NETWORK_FEED = os.environ.get("NETWORK_FEED", "1") == "1"
+# Keep a second authenticated Synapse tab warm to fail over to when the dashboard breaks.
+STANDBY_TAB = os.environ.get("STANDBY_TAB", "1") == "1"
+# Check the case-list API before rebuilding the dashboard UI; rebuild only when they disagree.
+API_PROBE = os.environ.get("API_PROBE", "1") == "1"
+# Let an in-page script click Accept the moment a complete case appears (see accept_agent.py).
+IN_PAGE_ACCEPT = os.environ.get("IN_PAGE_ACCEPT", "0") == "1"
+
+REQUEST_BLOCKER = RequestBlocker.from_env()
+
+if DETECTION_MODE == "observer":
+    CADENCE = PollCadence(SAFETY_POLL_SECONDS, SAFETY_POLL_MAX_SECONDS, LOCAL_TZ, log=log)
+else:
+    CADENCE = PollCadence(POLL_MIN_SECONDS, POLL_MAX_SECONDS, LOCAL_TZ, log=log)
+
+# Set from the environment when run standalone; otherwise they arrive with the supervisor's
+# Start message, after the browser is already up (see wait_for_start).
 EMAIL = os.environ.get("EMAIL")
 PASSWORD = os.environ.get("PASSWORD")
 OTP = os.environ.get("OTP")
@@ -71,67 +144,141 @@ TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
 
 
-def send_notification(msg):
-    """Send Telegram notification. Returns True on success, False on failure."""
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        log("Telegram disabled (missing token/chat id)")
-        return False
+def _on_telegram_delivery(ok, seconds):
+    record_metric("sevaro_telegram_send_seconds", seconds, source="bot")
+    if not ok:
+        record_metric("sevaro_telegram_failures_total", 1, source="bot")
+
+
+NOTIFIER = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, log, on_delivery=_on_telegram_delivery)
+
+
+def send_notification(msg, on_done=None):
+    """Queue a Telegram notification without blocking.
+    `on_done(ok)` runs once delivery succeeds or ultimately fails."""
+    NOTIFIER.send(msg, on_done)
+
+
+def _exit_unless_delivered(ok):
+    """Completion callback; runs on the notifier's sender thread."""
+    global EXIT_CODE
+    if not ok:
+        log("❌ Telegram failed. Exiting bot.", event="telegram_failed")
+        EXIT_CODE = 1
+        call_in_loop(request_shutdown)
 
-    log(f"📤 Sending Telegram: {msg}")
-    try:
-        r = requests.post(
-            f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
-            data={"chat_id": TELEGRAM_CHAT_ID, "text": msg},
-            timeout=10,
-        )
-        if r.ok:
-            log(f"📱 Telegram sent:\n{msg}")
-            return True
-        log(f"Telegram failed ({r.status_code}): {r.text}")
-        return False
-    except Exception as e:
-        log(f"Telegram error: {e}")
-        return False
 
+def send_notification_or_die(msg):
+    """Queue a Telegram notification; shut the bot down if it can't be delivered."""
+    send_notification(msg, on_done=_exit_unless_delivered)
 
-def login(page):
+
+async def login(page):
     log("🔐 Login required")
 
-    page.goto(LOGIN_URL)
-    page.fill('input[name="identifier"]', EMAIL)
-    page.click('input.button.button-primary[type="submit"]')
+    await page.goto(LOGIN_URL)
+    await page.fill('input[name="identifier"]', EMAIL)
+    await page.click('input.button.button-primary[type="submit"]')
 
-    page.wait_for_selector('input[type="password"]', timeout=20000)
-    page.fill('input[type="password"]', PASSWORD)
-    page.click('input.button.button-primary[type="submit"]')
+    await page.wait_for_selector('input[type="password"]', timeout=20000)
+    await page.fill('input[type="password"]', PASSWORD)
+    await page.click('input.button.button-primary[type="submit"]')
 
     totp_selector = 'input[name="otp"], input[name="credentials.passcode"], input[id*="totp"]'
-    page.wait_for_selector(totp_selector, timeout=20000)
+    await page.wait_for_selector(totp_selector, timeout=20000)
 
-    page.click(totp_selector)
-    page.type(totp_selector, OTP, delay=50)
-    page.click('input.button.button-primary[type="submit"]')
+    await page.click(totp_selector)
+    await page.type(totp_selector, OTP, delay=50)
+    await page.click('input.button.button-primary[type="submit"]')
 
-    page.wait_for_selector(SYNAPSE_SELECTOR, timeout=60000)
+    await page.wait_for_selector(SYNAPSE_SELECTOR, timeout=60000)
     log("✅ Login successful")
-    dump_page_html(page, "after_login")
+    await dump_page_html(page, "after_login")
+
+
+# ---- Saved session ----
+# After a successful login the context's cookies/localStorage are saved, tagged with the
+# account email, so the next start can skip the identifier/password/TOTP sequence.
+
+# Live session cookies: kept out of the source tree (and the image) in STATE_DIR, which
+# should be a volume in production.
+STATE_DIR = os.environ.get("STATE_DIR", "state")
+STORAGE_STATE_FILE = os.environ.get("STORAGE_STATE_FILE", os.path.join(STATE_DIR, "okta_state.json"))
+SESSION_CHECK_TIMEOUT_MS = 10000
+
+
+def load_saved_session():
+    """Return the saved storage state for EMAIL, or None if there is no usable one."""
+    try:
+        with open(STORAGE_STATE_FILE, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(saved, dict) or saved.get("email") != EMAIL:
+        return None
+    return saved.get("storage_state")
+
+
+async def save_session(context):
+    """Persist the context's storage state for the next start (owner-readable only)."""
+    try:
+        data = {"email": EMAIL, "saved_at": time.time(), "storage_state": await context.storage_state()}
+        os.makedirs(os.path.dirname(STORAGE_STATE_FILE) or ".", mode=0o700, exist_ok=True)
+        tmp = f"{STORAGE_STATE_FILE}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, STORAGE_STATE_FILE)
+        log("💾 Session saved for next start")
+    except Exception as e:
+        log(f"⚠️ Could not save session: {e}")
+
+
+def discard_saved_session():
+    """Forget the saved session (it is known to be expired)."""
+    try:
+        with open(STORAGE_STATE_FILE, "w", encoding="utf-8"):
+            pass
+    except OSError:
+        pass
+
+
+async def resume_session(page):
+    """Open the Okta home page with restored cookies. Returns True if still logged in."""
+    try:
+        await page.goto(HOME_URL)
+        await page.wait_for_selector(SYNAPSE_SELECTOR, timeout=SESSION_CHECK_TIMEOUT_MS)
+        log("♻️ Reused saved session, skipping login")
+        return True
+    except Exception as e:
+        log(f"🔐 Saved session is no longer valid: {e}")
+        return False
+
+
+async def login_or_resume(context, page, resumable):
+    """Reuse the saved session when possible, otherwise run the full credential login."""
+    if resumable and await resume_session(page):
+        return
+    if resumable:
+        await context.clear_cookies()
+    await login(page)
 
 
-def launch_synapse_tab(context, page):
+async def launch_synapse_tab(context, page):
     """Open a new Synapse tab from the Okta home page. Returns the new page."""
-    page.get_by_role("button", name="Settings for Synapse 2.0").click()
+    await page.get_by_role("button", name="Settings for Synapse 2.0").click()
 
     launch_btn = page.locator('[data-se="app-settings-launch-app-button"]')
-    launch_btn.wait_for(state="visible", timeout=15000)
+    await launch_btn.wait_for(state="visible", timeout=15000)
 
-    with context.expect_page() as new_page_info:
-        launch_btn.click()
+    async with context.expect_page() as new_page_info:
+        await launch_btn.click()
 
-    synapse_page = new_page_info.value
+    synapse_page = await new_page_info.value
     log("🚀 Synapse opened")
 
-    synapse_page.wait_for_load_state("load", timeout=30000)
-    dump_page_html(synapse_page, "after_synapse_opened")
+    await synapse_page.wait_for_load_state("load", timeout=30000)
+    await dump_page_html(synapse_page, "after_synapse_opened")
     return synapse_page
 
 
@@ -139,10 +286,10 @@ SYNAPSE_RENDER_TIMEOUT_MS = 15000
 SYNAPSE_MAX_RETRIES = 1
 
 
-def _synapse_app_is_healthy(synapse_page):
+async def _synapse_app_is_healthy(synapse_page):
     """Check if the Synapse SPA rendered with a sidebar (not an empty shell)."""
     try:
-        synapse_page.wait_for_selector(
+        await synapse_page.wait_for_selector(
             RESCUE_SELECTOR, state="visible", timeout=SYNAPSE_RENDER_TIMEOUT_MS
         )
         return True
@@ -150,316 +297,804 @@ def _synapse_app_is_healthy(synapse_page):
         return False
 
 
-def start_synapse(context, page):
+async def start_synapse(context, page):
     for attempt in range(1, SYNAPSE_MAX_RETRIES + 1):
         synapse_page = None
         try:
-            synapse_page = launch_synapse_tab(context, page)
+            synapse_page = await launch_synapse_tab(context, page)
 
-            if _synapse_app_is_healthy(synapse_page):
-                synapse_page.locator(RESCUE_SELECTOR).click()
+            if await _synapse_app_is_healthy(synapse_page):
+                await synapse_page.locator(RESCUE_SELECTOR).click()
                 log("🎯 Rescue Dashboard opened")
-                dump_page_html(synapse_page, "after_rescue_dashboard")
+                await dump_page_html(synapse_page, "after_rescue_dashboard")
                 return synapse_page
 
             log(f"⚠️ Synapse loaded without sidebar (attempt {attempt}/{SYNAPSE_MAX_RETRIES})")
-            dump_page_html(synapse_page, f"synapse_no_sidebar_attempt{attempt}")
+            await dump_page_html(synapse_page, f"synapse_no_sidebar_attempt{attempt}")
 
         except Exception as e:
             log(f"⚠️ Synapse failed to load (attempt {attempt}/{SYNAPSE_MAX_RETRIES}): {e}")
             if synapse_page is not None:
-                dump_page_html(synapse_page, f"synapse_error_attempt{attempt}")
+                await dump_page_html(synapse_page, f"synapse_error_attempt{attempt}")
 
-        if synapse_page is not None:
-            try:
-                synapse_page.close()
-            except Exception:
-                pass
+        await _close_quietly(synapse_page)
 
         if attempt < SYNAPSE_MAX_RETRIES:
             log("🔄 Closing Synapse tab, relaunching from Okta...")
-            page.bring_to_front()
-            page.goto(HOME_URL)
-            page.wait_for_load_state("load", timeout=30000)
-            time.sleep(3)
+            await page.bring_to_front()
+            await page.goto(HOME_URL)
+            await page.wait_for_load_state("load", timeout=30000)
+            await WAITS.locator("Synapse launcher", page.get_by_role("button", name="Settings for Synapse 2.0"),
+                                OKTA_HOME_WAIT_SECONDS)
 
     send_notification("❌ Synapse failed to load. Please start the bot again.")
     raise RuntimeError("Synapse failed to load after all attempts")
 
 
-def get_text(locator):
-    """Get text content from locator, or None if not found."""
-    return locator.text_content().strip() if locator.count() > 0 else None
-
-
-def extract_case_info(page):
+# ---- Case snapshot ----
+# Everything handle_new_case needs, gathered in a single page.evaluate round-trip
+# instead of a count()/text_content() IPC hop per locator.
+
+SNAPSHOT_SELECTORS = {
+    "popup": NOTIFICATION_POPUP_SELECTOR,
+    "rows": CASE_ROW_SELECTOR,
+    "badge": CASE_COUNT_BADGE_SELECTOR,
+    "login": 'input[name="identifier"]',
+    "row_hospital": "div.facility-name div",
+    "row_patient": 'div[data-dd-action-name="rescue-dashboard-patient-name"] span[data-dd-privacy="mask"] span[apptruncatepopover]',
+    "row_mrn": 'span[data-dd-action-name="rescue-dashboard-mrn"]',
+    "popup_hospital": '[data-dd-action-name="rescue-notification-facility-name"]',
+    "popup_patient": '[data-dd-action-name="rescue-notification-patient-name"]',
+    "popup_mrn": '[data-dd-action-name="rescue-notification-patient-mrn"]',
+}
+
+CASE_SNAPSHOT_JS = """
+(sel) => {
+    // Mirrors Playwright's button:has-text("Accept"): case-insensitive substring match.
+    const acceptIn = (root) => Array.from(root.querySelectorAll("button"))
+        .find((b) => (b.textContent || "").toLowerCase().includes("accept")) || null;
+    const text = (root, selector) => {
+        const el = root && root.querySelector(selector);
+        return el ? (el.textContent || "").trim() : null;
+    };
+    const popup = document.querySelector(sel.popup);
+    const rows = Array.from(document.querySelectorAll(sel.rows));
+    const row = rows.find((r) => acceptIn(r)) || rows[0] || null;
+    const badge = document.querySelector(sel.badge);
+    const badgeText = badge ? (badge.textContent || "").trim() : "";
+    return {
+        login: document.querySelector(sel.login) !== null,
+        badge: /^[0-9]+$/.test(badgeText) ? parseInt(badgeText, 10) : 0,
+        popup: popup !== null,
+        popup_accept: popup !== null && acceptIn(popup) !== null,
+        row: row !== null,
+        row_count: rows.length,
+        row_accept: row !== null && acceptIn(row) !== null,
+        accept: acceptIn(document) !== null,
+        popup_info: {
+            hospital: text(popup, sel.popup_hospital),
+            patient: text(popup, sel.popup_patient),
+            patient_id: text(popup, sel.popup_mrn),
+        },
+        row_info: {
+            hospital: text(row, sel.row_hospital),
+            patient: text(row, sel.row_patient),
+            patient_id: text(row, sel.row_mrn),
+        },
+        rows_info: rows.map((r) => ({
+            hospital: text(r, sel.row_hospital),
+            patient: text(r, sel.row_patient),
+            patient_id: text(r, sel.row_mrn),
+            accept: acceptIn(r) !== null,
+        })),
+    };
+}
+"""
+
+
+async def snapshot_case_state(page):
+    """Return popup/row/Accept-button presence, badge count and case info in one round-trip."""
+    return await page.evaluate(CASE_SNAPSHOT_JS, SNAPSHOT_SELECTORS)
+
+
+# ---- Page waits ----
+# Condition waits replace the fixed sleeps: each returns as soon as the page is ready
+# and gives up at its deadline (seconds). See page_waits.py.
+
+ACCEPT_WAIT_SECONDS = 20       # handle_new_case: an Accept button with complete case info
+REFRESH_STEP_SECONDS = 5       # each half of the away-and-back dashboard refresh
+STALE_TABLE_WAIT_SECONDS = 5   # case rows to render after the stale-table retry
+OKTA_HOME_WAIT_SECONDS = 15    # the Synapse launcher after returning to the Okta home page
+
+# The case handle_new_case would act on is complete (the popup's if it has an Accept
+# button, otherwise the dashboard row's), or there is no longer a case to wait for.
+CASE_READY_JS = """
+(sel) => {
+    const s = (%s)(sel);
+    if (s.badge === 0 || (!s.row && !s.popup)) return true;
+    const complete = (info) => !!(info.hospital && info.patient && info.patient_id);
+    return s.popup_accept ? complete(s.popup_info) : s.accept && complete(s.row_info);
+}
+""" % CASE_SNAPSHOT_JS
+
+
+def case_gone(snapshot):
+    """The pending case left the page, e.g. another clinician took it."""
+    return snapshot["badge"] == 0 or not (snapshot["row"] or snapshot["popup"])
+
+# The rescue dashboard is mounted and shows rows whenever the badge counts cases.
+DASHBOARD_RENDERED_JS = """
+(sel) => {
+    if (!document.querySelector(sel.indicator)) return false;
+    const s = (%s)(sel);
+    return s.badge === 0 || s.row;
+}
+""" % CASE_SNAPSHOT_JS
+
+
+def _on_wait(name, seconds, met):
+    record_metric("sevaro_page_wait_seconds", seconds, wait=name, outcome="met" if met else "timeout")
+
+
+WAITS = PageWaits(log, on_wait=_on_wait)
+
+
+def _info_tuple(info):
+    return info["hospital"], info["patient"], info["patient_id"]
+
+
+async def extract_case_info(page, snapshot=None):
     """Extract hospital name, patient name, and patient ID from the case row."""
     try:
-        case_row = page.locator('div.complete-row:has(button:has-text("Accept"))').first
-        if case_row.count() == 0:
-            case_row = page.locator('div.complete-row').first
-        if case_row.count() == 0:
+        snapshot = snapshot or await snapshot_case_state(page)
+        if not snapshot["row"]:
             return None, None, None
-
-        hospital = get_text(case_row.locator("div.facility-name div").first)
-        patient = get_text(case_row.locator('div[data-dd-action-name="rescue-dashboard-patient-name"] span[data-dd-privacy="mask"] span[apptruncatepopover]').first)
-        patient_id = get_text(case_row.locator('span[data-dd-action-name="rescue-dashboard-mrn"]').first)
-        return hospital, patient, patient_id
+        return _info_tuple(snapshot["row_info"])
     except Exception as e:
         log(f"⚠️ Error extracting case info: {e}")
         return None, None, None
 
 
-def extract_notification_case_info(page):
+async def extract_notification_case_info(page, snapshot=None):
     """Extract hospital, patient name, and patient ID from the notification popup."""
     try:
-        popup = page.locator(NOTIFICATION_POPUP_SELECTOR).first
-        if popup.count() == 0:
+        snapshot = snapshot or await snapshot_case_state(page)
+        if not snapshot["popup"]:
             return None, None, None
-
-        hospital = get_text(popup.locator('[data-dd-action-name="rescue-notification-facility-name"]').first)
-        patient = get_text(popup.locator('[data-dd-action-name="rescue-notification-patient-name"]').first)
-        patient_id = get_text(popup.locator('[data-dd-action-name="rescue-notification-patient-mrn"]').first)
-        return hospital, patient, patient_id
+        return _info_tuple(snapshot["popup_info"])
     except Exception as e:
         log(f"⚠️ Error extracting notification case info: {e}")
         return None, None, None
 
 
-def write_case_accepted(hospital, patient, patient_id):
-    """Write accepted case info to file so the Flask app can detect it."""
-    data = {
-        "hospital": hospital,
-        "patient": patient,
-        "patient_id": patient_id,
-        "accepted_at": datetime.now().astimezone().isoformat(),
-    }
-    with open(CASE_ACCEPTED_FILE, "w") as f:
-        json.dump(data, f)
-
-
-def clear_case_files():
-    """Remove case accepted/acknowledged files."""
-    for path in (CASE_ACCEPTED_FILE, CASE_ACKNOWLEDGED_FILE):
-        try:
-            os.remove(path)
-        except FileNotFoundError:
-            pass
+def _on_feed_update(cases, origin):
+    log(f"📡 Network feed: {len(cases)} case(s) from {origin}")
+
+
+CASE_FEED = CaseFeed(on_update=_on_feed_update, log=log)
+
+
+def case_info_from_feed(expected_cases, dom_info):
+    """Return the feed's case record when it unambiguously describes the one pending case
+    and has the same MRN as the popup or row about to be accepted (`dom_info`).
+    Returns None (so callers use the DOM fields) when the feed is off, empty, ambiguous,
+    or describes a different patient."""
+    if not NETWORK_FEED or expected_cases != 1:
+        return None
+    feed_case = CASE_FEED.sole_pending_case()
+    if feed_case is None or not dom_info.get("patient_id"):
+        return None
+    if feed_case.patient_id.strip() != dom_info["patient_id"].strip():
+        log(f"⚠️ Network feed case {feed_case.patient_id} does not match the page ({dom_info['patient_id']}); using the page",
+            public="⚠️ Network feed case does not match the page; using the page")
+        return None
+    return feed_case
+
 
+# ---- Supervisor channel ----
 
-def wait_for_acknowledge(hospital, patient, patient_id):
-    """Send Telegram every 30 seconds until user acknowledges via the UI.
-    Blocks the bot from accepting new cases while waiting."""
+HEARTBEAT_SECONDS = 10
+
+
+# Channel handlers run on the channel's reader thread and hand over to the event loop.
+
+def _on_acknowledge(message):
+    log("👤 Acknowledge received from supervisor.")
+    call_in_loop(ACKNOWLEDGED.set)
+
+
+def _on_supervisor_shutdown(message):
+    if message["event"] == channel.CLOSED:
+        log("🛑 Supervisor channel closed, shutting down...")
+    else:
+        log("🛑 Shutdown requested by supervisor...")
+    call_in_loop(request_shutdown)
+
+
+def send_heartbeat():
+    CHANNEL.send(
+        channel.HEARTBEAT,
+        failsafe_elapsed=round(time.time() - BOT_START_TIME),
+        blocked_requests=REQUEST_BLOCKER.summary() if REQUEST_BLOCKER else {},
+    )
+
+
+def start_channel():
+    """Start listening to the supervisor; no-op when the bot is run standalone."""
+    if CHANNEL is None:
+        log("⚠️ No supervisor channel (running standalone).")
+        return
+    CHANNEL.on(channel.START, lambda message: call_in_loop(begin_session, message))
+    CHANNEL.on(channel.ACKNOWLEDGE, _on_acknowledge)
+    CHANNEL.on(channel.TIMER_RESET, lambda message: call_in_loop(reset_failsafe_timer))
+    CHANNEL.on(channel.SHUTDOWN, _on_supervisor_shutdown)
+    CHANNEL.on(channel.CLOSED, _on_supervisor_shutdown)
+    CHANNEL.start()
+
+
+def record_metric(name, value, **labels):
+    """Ship one observation to the supervisor's /metrics; no-op when run standalone."""
+    if CHANNEL is not None:
+        CHANNEL.send(channel.METRIC, name=name, value=value, labels=labels)
+
+
+def write_case_detected(case_count):
+    """Tell the supervisor the dashboard shows pending cases (timestamped for latency tracking)."""
+    if CHANNEL is not None:
+        CHANNEL.send(channel.CASE_DETECTED, cases=case_count, ts=time.time())
+
+
+def write_seen_cases(entries):
+    """Tell the supervisor which pending cases the bot is skipping as not credentialed."""
+    if CHANNEL is not None:
+        CHANNEL.send(channel.SEEN_CASES, cases=entries)
+
+
+def write_case_accepted(hospital, patient, patient_id):
+    """Tell the supervisor a case was accepted so it can ask the user to acknowledge."""
+    if CHANNEL is None:
+        return
+    CHANNEL.send(
+        channel.CASE_ACCEPTED,
+        hospital=hospital,
+        patient=patient,
+        patient_id=patient_id,
+        accepted_at=datetime.now().astimezone().isoformat(),
+    )
+
+
+def case_accepted(hospital, patient, patient_id):
+    """Record an accepted case and hand it to acknowledge_loop. Until the user acknowledges
+    it, PENDING_ACK stops the watcher from accepting another case."""
+    global PENDING_ACK
+    PENDING_ACK = (hospital, patient, patient_id)
+    ACKNOWLEDGED.clear()
+    write_case_accepted(hospital, patient, patient_id)
+    ACCEPTED_CASES.put_nowait(PENDING_ACK)
+
+
+async def wait_for_acknowledge(hospital, patient, patient_id):
+    """Send Telegram every 30 seconds until user acknowledges via the UI."""
     msg = f"🚨 Rescue case accepted!\n\n🏥 Hospital: {hospital}\n👤 Patient: {patient}\n🆔 Patient ID: {patient_id}"
     log("⏳ Waiting for user to acknowledge the accepted case...")
+    started = time.monotonic()
 
-    while not SHUTDOWN_REQUESTED:
-        check_hard_timeout()
+    while not SHUTDOWN.is_set() and not ACKNOWLEDGED.is_set():
+        send_notification_or_die(msg)
+        await wait_first(ACKNOWLEDGED.wait(), SHUTDOWN.wait(), timeout=30)
 
-        if os.path.exists(CASE_ACKNOWLEDGED_FILE):
-            log("✅ Case acknowledged by user.")
-            clear_case_files()
-            return
+    if ACKNOWLEDGED.is_set():
+        log("✅ Case acknowledged by user.")
+        record_metric("sevaro_acknowledge_wait_seconds", time.monotonic() - started)
 
-        if not send_notification(msg):
-            log("❌ Telegram failed. Exiting bot.")
-            clear_case_files()
-            sys.exit(1)
 
-        for _ in range(300):
-            if SHUTDOWN_REQUESTED or os.path.exists(CASE_ACKNOWLEDGED_FILE):
-                break
-            time.sleep(0.1)
+async def acknowledge_loop():
+    """Task: nag about each accepted case until it is acknowledged, then let the watcher accept again."""
+    global PENDING_ACK
+    while True:
+        case = await ACCEPTED_CASES.get()
+        try:
+            await wait_for_acknowledge(*case)
+            if ACKNOWLEDGED.is_set():
+                PENDING_ACK = None
+                WAKEUP.set()
+        finally:
+            ACCEPTED_CASES.task_done()
 
-    if os.path.exists(CASE_ACKNOWLEDGED_FILE):
-        log("✅ Case acknowledged by user.")
-    clear_case_files()
+
+DUMP_STORE = DumpStore(log=log)
 
 
-def dump_page_html(page, label="debug"):
-    """Dump page HTML to a file for debugging."""
+async def dump_page_html(page, label="debug"):
+    """Copy the page HTML and hand it to the background dump store for debugging."""
     try:
-        ts = datetime.now(LOCAL_TZ).strftime("%Y%m%d_%H%M%S")
-        path = f"data/{ts}_{label}.html"
-        html = page.content()
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(html)
-        log(f"📄 Page HTML dumped to {path}")
+        DUMP_STORE.submit(label, await page.content())
     except Exception as e:
         log(f"⚠️ Could not dump page HTML: {e}")
 
 
-def handle_new_case(page):
+# ---- Known non-credentialed cases ----
+
+SEEN_CASES = SeenCaseCache(on_change=write_seen_cases)
+
+
+def only_known_cases_pending(snapshot):
+    """True when nothing on the page can be accepted and every row was already found
+    not credentialed, so handle_new_case's 20-second wait would learn nothing new.
+    False while the badge counts more cases than there are rows: one is not rendered yet."""
+    rows = snapshot["rows_info"]
+    if not rows or snapshot["accept"] or snapshot["badge"] > len(rows):
+        return False
+    return all(SEEN_CASES.contains(row) for row in rows)
+
+
+def remember_not_credentialed(snapshot):
+    for row in snapshot["rows_info"]:
+        if not row["accept"] and SEEN_CASES.add(row):
+            log(f"🗂️ Skipping {row['hospital']} / {row['patient_id']} for {SEEN_CASES.ttl / 60:.0f} min (not credentialed)",
+                public=f"🗂️ Skipping a case at {row['hospital']} for {SEEN_CASES.ttl / 60:.0f} min (not credentialed)")
+
+
+async def handle_new_case(page, expected_cases=None):
     """Look for an Accept button on the page and click it.
     Uses the same proven poll-and-click approach from v1.2/v1.3: find the button,
     extract case info, click, and trust the click succeeded.
+    Case info comes from the network feed when it unambiguously matches the
+    `expected_cases` badge count, otherwise it is scraped from the DOM.
     Returns: "accepted" if case was accepted,
              "not_credentialed" if no Accept button found (user not credentialed),
-             "failed" if credentialed but could not complete acceptance."""
+             "failed" if credentialed but could not complete acceptance,
+             "broken" if the page is no longer on the rescue dashboard."""
+    started = time.monotonic()
     try:
-        accept_selector = 'button:has-text("Accept")'
         saw_accept_button = False
 
         # Ensure we're on the rescue dashboard before looking for buttons
         try:
-            page.locator(RESCUE_DASHBOARD_INDICATOR).wait_for(state="attached", timeout=5000)
+            await page.locator(RESCUE_DASHBOARD_INDICATOR).wait_for(state="attached", timeout=5000)
         except Exception:
             log("⚠️ Not on rescue dashboard, dashboard is broken")
-            dump_page_html(page, "dashboard_broken")
-            if not send_notification("❌ Dashboard is broken, please restart the bot. A case was detected that you may be credentialed for, please check the dashboard manually."):
-                log("❌ Telegram failed. Exiting bot.")
-            sys.exit(1)
+            await dump_page_html(page, "dashboard_broken")
+            return "broken"
 
-        for attempt in range(20):
-            if SHUTDOWN_REQUESTED:
+        deadline = Deadline(ACCEPT_WAIT_SECONDS)
+        while not deadline.expired:
+            if SHUTDOWN.is_set():
+                return "not_credentialed"
+
+            snapshot = await snapshot_case_state(page)
+            if case_gone(snapshot):
+                log("💨 The pending case is gone (taken by someone else or withdrawn)")
                 return "not_credentialed"
 
             # Check notification popup first (overlays dashboard with higher z-index)
-            popup = page.locator(NOTIFICATION_POPUP_SELECTOR)
-            if popup.count() > 0:
-                popup_accept = popup.locator(accept_selector)
-                if popup_accept.count() > 0:
-                    saw_accept_button = True
-                    log("📢 Notification popup detected, using popup Accept button")
-                    hospital, patient, patient_id = extract_notification_case_info(page)
-
-                    if not hospital or not patient or not patient_id:
-                        log(f"⚠️ Invalid notification case info - Hospital: {hospital}, Patient: {patient}, ID: {patient_id}")
-                        dump_page_html(page, "invalid_notification_info")
-                        time.sleep(1)
-                        continue
+            if snapshot["popup_accept"]:
+                saw_accept_button = True
+                log("📢 Notification popup detected, using popup Accept button")
+                feed_case = case_info_from_feed(expected_cases, snapshot["popup_info"])
+                if feed_case:
+                    log(f"📡 Using case info from network feed ({feed_case.source})")
+                    hospital, patient, patient_id = feed_case.hospital, feed_case.patient, feed_case.patient_id
+                else:
+                    hospital, patient, patient_id = await extract_notification_case_info(page, snapshot)
+
+                if not hospital or not patient or not patient_id:
+                    log(f"⚠️ Invalid notification case info - Hospital: {hospital}, Patient: {patient}, ID: {patient_id}",
+                        public="⚠️ Invalid notification case info")
+                    await dump_page_html(page, "invalid_notification_info")
+                    await WAITS.function("complete case info", page, CASE_READY_JS, SNAPSHOT_SELECTORS, deadline.remaining())
+                    continue
 
-                    popup_accept.first.click(force=True)
-                    log(f"✅ Accepted case!\n   Hospital: {hospital}\n   Patient: {patient}\n   Patient ID: {patient_id}")
-                    dump_page_html(page, "accepted_popup")
-                    write_case_accepted(hospital, patient, patient_id)
-                    wait_for_acknowledge(hospital, patient, patient_id)
-                    return "accepted"
+                await page.locator(NOTIFICATION_POPUP_SELECTOR).locator(ACCEPT_BUTTON_SELECTOR).first.click(force=True)
+                record_metric("sevaro_detection_to_click_seconds", time.monotonic() - started, path="python")
+                log(f"✅ Accepted case!\n   Hospital: {hospital}\n   Patient: {patient}\n   Patient ID: {patient_id}",
+                    event="case_accepted", public="✅ Accepted case!")
+                if feed_case:
+                    CASE_FEED.forget(feed_case)
+                case_accepted(hospital, patient, patient_id)
+                await dump_page_html(page, "accepted_popup")
+                return "accepted"
 
             # Fall back to dashboard row Accept button
-            btn = page.locator(accept_selector)
-            if btn.count() > 0:
+            if snapshot["accept"]:
                 saw_accept_button = True
-                time.sleep(1)
-                hospital, patient, patient_id = extract_case_info(page)
+                feed_case = case_info_from_feed(expected_cases, snapshot["row_info"])
+                if feed_case:
+                    log(f"📡 Using case info from network feed ({feed_case.source})")
+                    hospital, patient, patient_id = feed_case.hospital, feed_case.patient, feed_case.patient_id
+                else:
+                    # The snapshot is taken in one JS turn, so a complete row can be trusted
+                    # as-is; an incomplete one is retried below once it finishes rendering.
+                    hospital, patient, patient_id = await extract_case_info(page, snapshot)
 
                 if not hospital or not patient or not patient_id:
-                    log(f"⚠️ Invalid case info - Hospital: {hospital}, Patient: {patient}, ID: {patient_id}")
-                    dump_page_html(page, "invalid_case_info")
-                    time.sleep(1)
+                    log(f"⚠️ Invalid case info - Hospital: {hospital}, Patient: {patient}, ID: {patient_id}",
+                        public="⚠️ Invalid case info")
+                    await dump_page_html(page, "invalid_case_info")
+                    await WAITS.function("complete case info", page, CASE_READY_JS, SNAPSHOT_SELECTORS, deadline.remaining())
                     continue
 
-                btn.first.click(force=True)
-                log(f"✅ Accepted case!\n   Hospital: {hospital}\n   Patient: {patient}\n   Patient ID: {patient_id}")
-                dump_page_html(page, "accepted_dashboard")
-                write_case_accepted(hospital, patient, patient_id)
-                wait_for_acknowledge(hospital, patient, patient_id)
+                await page.locator(ACCEPT_BUTTON_SELECTOR).first.click(force=True)
+                record_metric("sevaro_detection_to_click_seconds", time.monotonic() - started, path="python")
+                log(f"✅ Accepted case!\n   Hospital: {hospital}\n   Patient: {patient}\n   Patient ID: {patient_id}",
+                    event="case_accepted", public="✅ Accepted case!")
+                if feed_case:
+                    CASE_FEED.forget(feed_case)
+                case_accepted(hospital, patient, patient_id)
+                await dump_page_html(page, "accepted_dashboard")
                 return "accepted"
 
-            time.sleep(1)
+            await WAITS.function("Accept button", page, CASE_READY_JS, SNAPSHOT_SELECTORS, deadline.remaining())
 
+        # A button may have appeared without its case info ever completing
+        snapshot = await snapshot_case_state(page)
+        saw_accept_button = saw_accept_button or snapshot["accept"]
         if saw_accept_button:
-            log("⚠️ Accept button was visible but could not complete accept")
-            dump_page_html(page, "failed_accept_credentialed")
+            log("⚠️ Accept button was visible but could not complete accept", event="accept_failed")
+            await dump_page_html(page, "failed_accept_credentialed")
             return "failed"
         else:
-            log("💤 No Accept button (not credentialed for this case)")
+            log("💤 No Accept button (not credentialed for this case)", event="not_credentialed")
+            remember_not_credentialed(snapshot)
             return "not_credentialed"
     except Exception as e:
         log(f"⚠️ Error in handle_new_case: {e}")
-        dump_page_html(page, "handle_error")
+        await dump_page_html(page, "handle_error")
         return "failed"
 
 
-def get_case_count(page):
+async def get_case_count(page):
     """Get number of pending cases from badge, or 0 if none."""
-    badge = page.locator("li.rescue-dashboard-container .rescue-dashboard-count")
-    if badge.count() == 0:
-        return 0
-    text = (badge.text_content() or "").strip()
-    return int(text) if text.isdigit() else 0
-
-
-def interruptible_sleep(seconds):
-    """Sleep that can be interrupted by shutdown signal."""
-    for _ in range(int(seconds * 10)):
-        if SHUTDOWN_REQUESTED:
-            return
-        time.sleep(0.1)
+    return (await snapshot_case_state(page))["badge"]
 
 
 RESCUE_DASHBOARD_INDICATOR = "app-rescue-dashboard"
 
+# ---- Push-based detection ----
+# A MutationObserver inside the page watches the popup, case rows and count badge,
+# and reports every change of their combined state through an exposed binding.
+
+CASE_OBSERVER_BINDING = "__rescueBotOnDomChange"
+CASE_OBSERVER_JS = """
+(() => {
+    if (window.__rescueBotObserver) return;
+    const cfg = %s;
+    const signature = () => {
+        const badge = document.querySelector(cfg.badge);
+        return JSON.stringify({
+            popup: document.querySelectorAll(cfg.popup).length,
+            rows: document.querySelectorAll(cfg.rows).length,
+            badge: badge ? (badge.textContent || "").trim() : "",
+        });
+    };
+    let last = null;
+    let scheduled = null;
+    const flush = () => {
+        scheduled = null;
+        const sig = signature();
+        if (sig === last) return;
+        last = sig;
+        const report = window[cfg.binding];
+        if (report) report(JSON.parse(sig));
+    };
+    const start = () => {
+        last = signature();
+        window.__rescueBotObserver = new MutationObserver(() => {
+            if (scheduled === null) scheduled = setTimeout(flush, 10);
+        });
+        window.__rescueBotObserver.observe(document.documentElement, {
+            childList: true, subtree: true, characterData: true,
+        });
+    };
+    if (document.documentElement) start();
+    else document.addEventListener("DOMContentLoaded", start);
+})();
+""" % json.dumps({
+    "binding": CASE_OBSERVER_BINDING,
+    "popup": NOTIFICATION_POPUP_SELECTOR,
+    "rows": CASE_ROW_SELECTOR,
+    "badge": CASE_COUNT_BADGE_SELECTOR,
+})
+DOM_CHANGED = False
+LAST_DOM_STATE = None
+
+
+def _on_dom_change(source, state):
+    """Binding callback: the observer saw the popup, rows or badge change."""
+    global DOM_CHANGED, LAST_DOM_STATE
+    DOM_CHANGED = True
+    LAST_DOM_STATE = state
+    WAKEUP.set()
+
+
+async def install_case_observer(page):
+    """Inject the MutationObserver into the page (and into any future reload of it)."""
+    await page.expose_binding(CASE_OBSERVER_BINDING, _on_dom_change)
+    await page.add_init_script(CASE_OBSERVER_JS)
+    await page.evaluate(CASE_OBSERVER_JS)
+    log("👁️ Case observer installed")
+
+
+async def wait_for_change(seconds):
+    """Wait until the observer reports a change, an acknowledge or shutdown wakes the
+    watcher, or `seconds` pass. Returns True if the dashboard changed.
+    Bindings are dispatched by the event loop, so a change wakes this immediately."""
+    global DOM_CHANGED
+    if not WAKEUP.is_set():
+        await wait_first(WAKEUP.wait(), timeout=seconds)
+    WAKEUP.clear()
+    changed = DOM_CHANGED
+    DOM_CHANGED = False
+    if changed:
+        log(f"👁️ Dashboard changed: {LAST_DOM_STATE}")
+    return changed
+
+
+# ---- In-page accept agent ----
+
+def _on_agent_report():
+    WAKEUP.set()  # Let the watcher record the accept promptly
+
+
+ACCEPT_AGENT = AcceptAgent(SNAPSHOT_SELECTORS, log, on_report=_on_agent_report) if IN_PAGE_ACCEPT else None
+
+
+async def finish_agent_accept(page):
+    """Disarm the agent and, if it accepted a case, record it and hand it to the
+    acknowledge task like handle_new_case does. Returns True if the agent had accepted a case."""
+    case = await ACCEPT_AGENT.collect(page)
+    if not case:
+        return False
+    hospital, patient, patient_id = case["hospital"], case["patient"], case["patient_id"]
+    log(f"✅ Accepted case! (in-page agent, {case['source']})\n   Hospital: {hospital}\n   Patient: {patient}\n   Patient ID: {patient_id}",
+        event="case_accepted", public=f"✅ Accepted case! (in-page agent, {case['source']})")
+    record_metric("sevaro_detection_to_click_seconds", case["latency_ms"] / 1000, path="agent")
+    case_accepted(hospital, patient, patient_id)
+    await dump_page_html(page, "accepted_agent")
+    return True
+
 
-def _refresh_dashboard(page):
+async def _refresh_dashboard(page):
     """Navigate away from rescue dashboard and back to force Angular to rebuild the component.
     This ensures the table always shows fresh data from the API."""
+    started = time.monotonic()
     try:
         away_link = page.locator("li.waitingRoom")
-        if away_link.count() > 0 and away_link.first.is_visible():
-            away_link.first.click()
-            time.sleep(2)
+        if await away_link.count() > 0 and await away_link.first.is_visible():
+            await away_link.first.click()
+            await WAITS.locator("dashboard teardown", page.locator(RESCUE_DASHBOARD_INDICATOR), REFRESH_STEP_SECONDS, state="detached")
         rescue_link = page.locator(RESCUE_SELECTOR)
-        if rescue_link.count() > 0 and rescue_link.first.is_visible():
-            rescue_link.first.click()
-            time.sleep(2)
+        if await rescue_link.count() > 0 and await rescue_link.first.is_visible():
+            deadline = Deadline(REFRESH_STEP_SECONDS)
+            if CASE_FEED.list_endpoint:
+                # The rebuilt component refetches the case list; wait for that rather than for any render
+                list_path = CASE_FEED.list_endpoint[0].split("?")[0]
+                await WAITS.response("case list", page, lambda response: response.url.split("?")[0] == list_path,
+                                     rescue_link.first.click, deadline.remaining())
+            else:
+                await rescue_link.first.click()
+            await WAITS.function("dashboard render", page, DASHBOARD_RENDERED_JS,
+                                 dict(SNAPSHOT_SELECTORS, indicator=RESCUE_DASHBOARD_INDICATOR), deadline.remaining())
     except Exception as e:
         log(f"⚠️ Dashboard refresh failed: {e}")
+    record_metric("sevaro_refresh_dashboard_seconds", time.monotonic() - started)
+
+
+async def dashboard_needs_rebuild(page, snapshot):
+    """Compare the rendered dashboard with the case-list API. Until the feed has seen the
+    SPA fetch that list (or with API_PROBE=0) every pass rebuilds, as before."""
+    if snapshot["login"]:
+        return False  # Rebuilding can't help; the caller handles the expired session
+    cases = await CASE_FEED.probe(page.context.request) if API_PROBE else None
+    if cases is None:
+        record_metric("sevaro_dashboard_probes_total", 1, outcome="unavailable")
+        return True
+    agrees = snapshot["row_count"] == len(cases) and (snapshot["badge"] > 0) == bool(cases)
+    record_metric("sevaro_dashboard_probes_total", 1, outcome="agree" if agrees else "disagree")
+    if not agrees:
+        log(f"🔍 API lists {len(cases)} case(s) but the dashboard shows {snapshot['row_count']} row(s), badge {snapshot['badge']}; rebuilding")
+    return not agrees
+
+
+# ---- Hot standby ----
+
+STANDBY_RETRY_MIN_SECONDS = 30
+STANDBY_RETRY_MAX_SECONDS = 15 * 60
+
+
+class SynapseTabs:
+    """The active Synapse tab plus a warm, already-authenticated standby tab.
+    When the active dashboard breaks, the standby is promoted instead of exiting.
+    The standby is built by its own task (keep_standby), never by the watcher."""
+
+    def __init__(self, context, okta_page, active):
+        self.context = context
+        self.okta_page = okta_page
+        self.active = active
+        self.standby = None
+        self.standby_needed = asyncio.Event()  # Set when failover used up the standby
+
+    async def keep_standby(self):
+        """Task: keep a standby tab ready, backing off exponentially while building one fails
+        (e.g. the Okta home tab has expired)."""
+        delay = STANDBY_RETRY_MIN_SECONDS
+        while not SHUTDOWN.is_set():
+            if self.standby is None and not await self.prepare_standby():
+                log(f"🛟 Retrying the standby tab in {delay:.0f}s")
+                await wait_first(SHUTDOWN.wait(), timeout=delay)
+                delay = min(delay * 2, STANDBY_RETRY_MAX_SECONDS)
+                continue
+            delay = STANDBY_RETRY_MIN_SECONDS
+            await wait_first(self.standby_needed.wait(), SHUTDOWN.wait())
+            self.standby_needed.clear()
+
+    async def prepare_standby(self):
+        """Open a standby tab on the rescue dashboard. Returns False if it could not."""
+        page = None
+        try:
+            page = await launch_synapse_tab(self.context, self.okta_page)
+            if not await _synapse_app_is_healthy(page):
+                raise RuntimeError("Synapse loaded without sidebar")
+            await page.locator(RESCUE_SELECTOR).click()
+            await page.locator(RESCUE_DASHBOARD_INDICATOR).wait_for(state="attached", timeout=SYNAPSE_RENDER_TIMEOUT_MS)
+            self.standby = page
+            log("🛟 Standby Synapse tab ready")
+            return True
+        except Exception as e:
+            log(f"⚠️ Could not prepare standby tab: {e}")
+            await _close_quietly(page)
+            return False
+
+    async def failover(self, reason):
+        """Promote the standby to active. Returns the new active page, or None if there is none.
+        The agent is installed disarmed; the watcher arms it once no case awaits acknowledge."""
+        if self.standby is None:
+            return None
+        broken, self.active, self.standby = self.active, self.standby, None
+        self.standby_needed.set()
+        log(f"🔀 Failing over to standby Synapse tab ({reason})", event="failover")
+        await self.active.bring_to_front()
+        if DETECTION_MODE == "observer":
+            await install_case_observer(self.active)
+        if ACCEPT_AGENT:
+            await ACCEPT_AGENT.install(self.active)
+        await _close_quietly(broken)
+        return self.active
+
+
+async def _close_quietly(page):
+    if page is None:
+        return
+    try:
+        await page.close()
+    except Exception:
+        pass
 
 
-def bot_loop(page):
+async def bot_loop(tabs):
+    """Task: watch the dashboard and accept cases. Keeps watching while a case awaits
+    acknowledge, but accepts nothing until acknowledge_loop clears PENDING_ACK."""
+    global EXIT_CODE
     last_state = None
+    held_for = None  # Why pending cases are not being handled: "ack", "known" or None
+    rebuilt_for = None  # (badge, rows) of the last badge/table mismatch rebuilt for
     cases_without_popup = 0
     POPUP_FAILURE_THRESHOLD = 3
-    log("👀 Bot running...")
+    observer_mode = DETECTION_MODE == "observer"
+    dom_changed = False
+    agent_armed = False
+    page = tabs.active
+    log(f"👀 Bot running ({DETECTION_MODE} mode)...", event="watching")
 
     try:
-        while not SHUTDOWN_REQUESTED:
-            check_hard_timeout()
-
-            _refresh_dashboard(page)
-
-            if page.locator('input[name="identifier"]').count() > 0:
-                log("⚠️ Detected login page. Session expired, exiting bot.")
-                dump_page_html(page, "session_expired")
+        if observer_mode:
+            await install_case_observer(page)
+        if ACCEPT_AGENT:
+            await ACCEPT_AGENT.install(page)
+
+        while not SHUTDOWN.is_set():
+            page = tabs.active
+            iteration_started = time.monotonic()
+            SEEN_CASES.prune()
+
+            # The agent accepted a case in-page since the last pass (collecting it disarms the agent)
+            if ACCEPT_AGENT and ACCEPT_AGENT.reported:
+                if await finish_agent_accept(page):
+                    record_metric("sevaro_cases_total", 1, result="accepted")
+                    cases_without_popup = 0
+                agent_armed = False
+
+            # The observed DOM is already live; on other passes rebuild it only if the API disagrees.
+            snapshot = await snapshot_case_state(page)
+            if not dom_changed and await dashboard_needs_rebuild(page, snapshot):
+                await _refresh_dashboard(page)
+                snapshot = await snapshot_case_state(page)
+            if snapshot["login"]:
+                log("⚠️ Detected login page. Session expired, exiting bot.", event="session_expired")
+                await dump_page_html(page, "session_expired")
+                discard_saved_session()
                 send_notification("❌ Session expired while running. Please start the bot again.")
                 return
 
-            case_count = get_case_count(page)
+            case_count = snapshot["badge"]
 
             if case_count > 0:
                 # Check if table is stale (badge shows cases but table is empty)
-                has_rows = page.locator("div.complete-row").count() > 0
+                has_rows = snapshot["row"]
                 if not has_rows:
                     log("⚠️ Badge shows cases but table is empty — retrying refresh")
-                    _refresh_dashboard(page)
-                    time.sleep(3)
-                    has_rows = page.locator("div.complete-row").count() > 0
+                    await _refresh_dashboard(page)
+                    has_rows = await WAITS.function("case rows", page, "(sel) => !!document.querySelector(sel.rows)",
+                                                    SNAPSHOT_SELECTORS, STALE_TABLE_WAIT_SECONDS)
                     if not has_rows:
-                        log("⚠️ Still no rows after retry — dashboard is broken")
-                        dump_page_html(page, "dashboard_broken")
-                        if not send_notification("❌ Dashboard is broken, the bot has shut down. A case was detected that you may be credentialed for, please check the dashboard manually."):
-                            log("❌ Telegram failed. Exiting bot.")
-                            sys.exit(1)
+                        log("⚠️ Still no rows after retry — dashboard is broken", event="dashboard_broken")
+                        await dump_page_html(page, "dashboard_broken")
+                        if await tabs.failover("stale table"):
+                            dom_changed = agent_armed = False
+                            continue
+                        send_notification_or_die("❌ Dashboard is broken, the bot has shut down. A case was detected that you may be credentialed for, please check the dashboard manually.")
                         return
-
-                if last_state != "has_cases":
-                    log(f"🔔 New case detected: {case_count}")
-                    dump_page_html(page, "new_case_detected")
-                result = handle_new_case(page)
-                if result == "accepted":
+                elif (case_count > snapshot["row_count"] and PENDING_ACK is None and not snapshot["accept"]
+                      and rebuilt_for != (case_count, snapshot["row_count"])):
+                    # The badge counts a case the table has not rendered (the observer skips the API
+                    # check). Rebuild once per mismatch; the rebuild itself wakes the observer.
+                    log(f"🔍 Badge shows {case_count} case(s) but only {snapshot['row_count']} row(s); rebuilding")
+                    rebuilt_for = (case_count, snapshot["row_count"])
+                    await _refresh_dashboard(page)
+                    snapshot = await snapshot_case_state(page)
+
+                new_case = last_state != "has_cases"
+                if new_case:
+                    log(f"🔔 New case detected: {case_count}", event="case_detected")
+                    CADENCE.record_arrival()
+                if PENDING_ACK is not None:
+                    if held_for != "ack":
+                        log(f"⏸️ {case_count} case(s) pending; accepting once the last case is acknowledged")
+                    held_for = "ack"
+                    result = None
+                elif only_known_cases_pending(snapshot):
+                    # Already checked: stay responsive to new cases instead of re-waiting 20s
+                    if held_for != "known":
+                        log(f"💤 Only known non-credentialed case(s) pending ({len(snapshot['rows_info'])})")
+                    held_for = "known"
+                    result = None
+                else:
+                    held_for = None
+                    write_case_detected(case_count)
+                    handle_started = time.monotonic()
+                    # Taking the agent's result also disarms it, so it never races handle_new_case
+                    if ACCEPT_AGENT and await finish_agent_accept(page):
+                        result = "accepted"
+                    else:
+                        result = await handle_new_case(page, expected_cases=case_count)
+                    agent_armed = False
+                    record_metric("sevaro_handle_new_case_seconds", time.monotonic() - handle_started, result=result)
+                    record_metric("sevaro_cases_total", 1, result=result)
+                if new_case:
+                    # Dumped and saved after handling so neither the page serialization nor the disk delays the click
+                    await dump_page_html(page, "new_case_detected")
+                    await asyncio.to_thread(CADENCE.save)
+                if result == "broken":
+                    if await tabs.failover("not on rescue dashboard"):
+                        dom_changed = agent_armed = False
+                        continue
+                    send_notification("❌ Dashboard is broken, please restart the bot. A case was detected that you may be credentialed for, please check the dashboard manually.")
+                    EXIT_CODE = 1
+                    return
+                elif result == "accepted":
                     cases_without_popup = 0
                 elif result == "failed":
-                    if not send_notification("🚨 Credentialed case seen but unable to accept, please manually accept the case."):
-                        log("❌ Telegram failed. Exiting bot.")
-                        sys.exit(1)
+                    send_notification_or_die("🚨 Credentialed case seen but unable to accept, please manually accept the case.")
                     cases_without_popup += 1
                     if cases_without_popup >= POPUP_FAILURE_THRESHOLD:
                         log(f"⚠️ {cases_without_popup} consecutive credentialed cases with no popup. Notification system may be dead.")
-                        dump_page_html(page, "notification_system_dead")
-                        if not send_notification(f"⚠️ {cases_without_popup} credentialed cases failed acceptance. Restarting bot to reconnect notifications."):
-                            log("❌ Telegram failed. Exiting bot.")
-                            sys.exit(1)
+                        await dump_page_html(page, "notification_system_dead")
+                        # A fresh tab reconnects the notification stream without a restart
+                        if await tabs.failover("notification system dead"):
+                            cases_without_popup = 0
+                            dom_changed = agent_armed = False
+                            continue
+                        send_notification_or_die(f"⚠️ {cases_without_popup} credentialed cases failed acceptance. Restarting bot to reconnect notifications.")
                         return
                 # "not_credentialed" - don't count toward popup failure threshold
                 last_state = "has_cases"
@@ -467,55 +1102,224 @@ def bot_loop(page):
                 if last_state != "no_cases":
                     log("💤 No cases")
                 last_state = "no_cases"
+                held_for = None
+                SEEN_CASES.clear()
+
+            # The agent may accept again only once the last case is acknowledged
+            if ACCEPT_AGENT and not agent_armed and PENDING_ACK is None:
+                await ACCEPT_AGENT.arm(page)
+                agent_armed = True
+
+            record_metric("sevaro_bot_loop_iteration_seconds", time.monotonic() - iteration_started)
 
-            interruptible_sleep(2)
+            dom_changed = await wait_for_change(CADENCE.next_interval())
     except Exception as e:
         log(f"⚠️ Unhandled bot error: {e}")
-        dump_page_html(page, "unhandled_error")
+        await dump_page_html(page, "unhandled_error")
+
+
+async def watch(tabs):
+    """Run the page watcher alongside the acknowledge task. If the watcher stops on its own
+    (e.g. the session expired) a case still awaiting acknowledge keeps being nagged about."""
+    acknowledger = asyncio.create_task(acknowledge_loop(), name="acknowledge")
+    standby = asyncio.create_task(tabs.keep_standby(), name="standby") if STANDBY_TAB else None
+    try:
+        await bot_loop(tabs)
+        if standby:
+            standby.cancel()
+        if PENDING_ACK is not None and not SHUTDOWN.is_set():
+            log("⏳ Watcher stopped; waiting for the accepted case to be acknowledged before exiting")
+            await wait_first(ACCEPTED_CASES.join(), SHUTDOWN.wait())
+    finally:
+        acknowledger.cancel()
+        if standby:
+            standby.cancel()
+
+
+async def watchdog_loop():
+    """Task: enforce the failsafe runtime and send heartbeats, whatever the watcher is doing."""
+    next_heartbeat = 0
+    while True:
+        check_hard_timeout()
+        if CHANNEL is not None and time.monotonic() >= next_heartbeat:
+            send_heartbeat()
+            next_heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+        await asyncio.sleep(WATCHDOG_INTERVAL_SECONDS)
+
+
+async def run_until_shutdown(coro, grace=SHUTDOWN_GRACE_SECONDS):
+    """Run `coro` until it finishes. Once shutdown is requested it gets `grace` seconds
+    to notice and wind down, then it is cancelled (e.g. stuck in a 60s page load)."""
+    task = asyncio.create_task(coro)
+    await wait_first(asyncio.shield(task), SHUTDOWN.wait())
+    if not task.done():
+        await wait_first(asyncio.shield(task), timeout=grace)
+    if not task.done():
+        log(f"⛔ Still busy {grace}s after shutdown was requested; cancelling")
+        task.cancel()
+    await asyncio.wait([task])
+    if not task.cancelled() and task.exception() is not None:
+        raise task.exception()
 
 
 # ================= MAIN =================
 
-def log_external_ip(playwright):
+EXTERNAL_IP_URL = os.environ.get("EXTERNAL_IP_URL", "https://api.ipify.org")
+STARTUP_PHASES = []  # (phase, seconds) in the order they finished
+
+
+@contextmanager
+def startup_phase(name):
+    """Time one step of startup; the totals are logged once the bot is watching."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        STARTUP_PHASES.append((name, elapsed))
+        record_metric("sevaro_startup_phase_seconds", elapsed, phase=name)
+        log(f"⏱️ {name}: {elapsed:.2f}s")
+
+
+def log_startup_summary():
+    total = time.time() - BOT_START_TIME
+    phases = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in STARTUP_PHASES)
+    log(f"⏱️ Startup took {total:.1f}s ({phases})")
+
+
+def log_external_ip():
     """Log the external IP address for verification."""
-    test_browser = None
+    started = time.monotonic()
     try:
-        test_browser = playwright.chromium.launch(headless=True, args=["--disable-ipv6"])
-        test_context = test_browser.new_context()
-        test_page = test_context.new_page()
-        test_page.goto("https://api.ipify.org", timeout=15000)
-        ip = test_page.locator("body").text_content().strip()
-        log(f"🌐 External IP: {ip}")
-        test_browser.close()
+        response = requests.get(EXTERNAL_IP_URL, timeout=15)
+        response.raise_for_status()
+        log(f"🌐 External IP: {response.text.strip()} ({time.monotonic() - started:.2f}s)")
     except Exception as e:
         log(f"⚠️ Could not determine external IP: {e}")
-        if test_browser:
-            test_browser.close()
 
 
-with sync_playwright() as p:
-    browser = None
-    try:
-        clear_case_files()
-        log("🧹 Cleared stale case files from previous run.")
+def start_external_ip_check():
+    """Check the egress IP in the background while the browser launches and logs in."""
+    thread = threading.Thread(target=log_external_ip, name="external-ip", daemon=True)
+    thread.start()
+    return thread
 
-        log_external_ip(p)
 
-        browser = p.chromium.launch(
-            headless=True,
-            args=["--disable-ipv6"]
-        )
+# ---- Prewarmed start ----
+# The supervisor launches the bot before anyone presses Start: Python, Playwright and
+# Chromium come up, then the bot idles until a START message brings the credentials.
+# Each process serves one session; the supervisor prewarms a new one when it ends.
+
+SESSION_REQUESTED = asyncio.Event()
+
+
+def begin_session(message):
+    """Handle the supervisor's Start: take the credentials and start the clocks from now."""
+    global EMAIL, PASSWORD, OTP, BOT_START_TIME
+    if SESSION_REQUESTED.is_set():
+        return
+    EMAIL, PASSWORD, OTP = message.get("email"), message.get("password"), message.get("otp")
+    STARTUP_PHASES.clear()
+    BOT_START_TIME = time.time()
+    log("▶️ Start received", event="session_start")
+    SESSION_REQUESTED.set()
+
 
-        context = browser.new_context()
-        page = context.new_page()
-        login(page)
-        new_page = start_synapse(context, page)
-        if not send_notification("🟢 Bot is now watching for rescue cases."):
-            log("❌ Telegram failed. Exiting bot.")
-            sys.exit(1)
-        bot_loop(new_page)
+async def wait_for_start(browser):
+    """Return True once there are credentials to run a session with, or False if the bot
+    should exit instead (shutdown, browser gone, or no credentials when standalone)."""
+    if EMAIL:
+        return True
+    if CHANNEL is None:
+        log("❌ EMAIL, PASSWORD and OTP must be set when running standalone.")
+        return False
+    log("🔥 Browser ready; waiting for Start")
+    disconnected = asyncio.Event()
+    browser.on("disconnected", lambda _: disconnected.set())
+    await wait_first(SESSION_REQUESTED.wait(), SHUTDOWN.wait(), disconnected.wait())
+    if disconnected.is_set():
+        log("⚠️ Browser went away while waiting for Start")
+    return SESSION_REQUESTED.is_set() and not disconnected.is_set()
+
+
+async def run_session(browser):
+    """Open a fresh context, log in, open Synapse and watch until done. Always closes the context."""
+    context = None
+    try:
+        with startup_phase("context"):
+            saved_state = load_saved_session()
+            context = await browser.new_context(storage_state=saved_state)
+            if REQUEST_BLOCKER:
+                await REQUEST_BLOCKER.install(context)
+            if NETWORK_FEED:
+                # Attach before Synapse opens so its first API calls and WebSocket are seen
+                CASE_FEED.attach_context(context)
+            page = await context.new_page()
+        with startup_phase("session resume" if saved_state is not None else "login"):
+            await login_or_resume(context, page, resumable=saved_state is not None)
+        with startup_phase("synapse"):
+            new_page = await start_synapse(context, page)
+        await save_session(context)
+        send_notification_or_die("🟢 Bot is now watching for rescue cases.")
+        log_startup_summary()
+        await watch(SynapseTabs(context, page, new_page))
 
     finally:
-        if browser:
-            log("🧹 Closing browser...")
-            browser.close()
+        if REQUEST_BLOCKER:
+            log(f"🚫 Blocked requests: {REQUEST_BLOCKER.summary()}")
+        if context:
+            log("🧹 Closing browser context...")
+            try:
+                await context.close()
+            except Exception as e:
+                log(f"⚠️ Error closing browser context: {e}")
+
+
+async def run():
+    global LOOP
+    LOOP = asyncio.get_running_loop()
+    install_signal_handlers()
+    start_channel()
+    watchdog = None
+    try:
+        async with async_playwright() as p:
+            with startup_phase("browser launch"):
+                # Connects to the supervisor's shared browser in multi-tenant mode
+                browser, shared_browser = await open_browser(p)
+            try:
+                if await wait_for_start(browser):
+                    start_external_ip_check()
+                    watchdog = asyncio.create_task(watchdog_loop(), name="watchdog")
+                    await run_until_shutdown(run_session(browser))
+            finally:
+                # Other tenants use a shared browser; run_session closed our own context
+                if not shared_browser:
+                    log("🧹 Closing browser...")
+                    try:
+                        await browser.close()
+                    except Exception as e:
+                        log(f"⚠️ Error closing browser: {e}")
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        # Let queued notifications (e.g. the reason we are exiting) go out first
+        if not await asyncio.to_thread(NOTIFIER.close, 30):
+            log("⚠️ Timed out delivering queued Telegram messages.")
+        await asyncio.to_thread(DUMP_STORE.flush, 10)
+
+
+def main():
+    # Under the supervisor, records go to its log file and /logs; standalone, to our own file.
+    # Set up here, not at import, so extraction_bench can import the extraction code without
+    # starting a log file in its working directory.
+    logs.setup(
+        "bot",
+        to_file=CHANNEL is None,
+        forward=(lambda record: CHANNEL.send(channel.LOG, record=record)) if CHANNEL else None,
+    )
+    asyncio.run(run())
+    sys.exit(EXIT_CODE)
+
+
+if __name__ == "__main__":
+    main()
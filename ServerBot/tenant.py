@@ -0,0 +1,421 @@
+"""Supervision of one user's bot.
+
+A Tenant owns everything app.py used to keep in globals for its single bot:
+the bot process and its event channel, the run timer, the pending-acknowledge
+state and the Telegram chat. The supervisor keeps one Tenant per user, and each
+Tenant guarantees at most one running bot for that user.
+
+With PREWARM_BOT (the default), the Tenant also keeps one idle bot process whose
+browser is already up. Start hands it the credentials over the event channel, so
+a session skips interpreter, Playwright and Chromium startup. Each process serves
+a single session and exits when it is stopped, so nothing carries over to the
+next one; a fresh process is prewarmed as soon as the old one is gone.
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+from threading import Thread, Lock
+
+import channel
+import logs
+from browser_host import CDP_ENDPOINT_ENV
+from deadline_timer import DeadlineTimer
+from metrics import REGISTRY, chromium_rss_bytes
+from notifier import TelegramNotifier
+
+
+TIMER_DURATION = 60 * 60  # 1 hour
+WARNING_TIME = 5 * 60  # 5 minutes before expiry
+DEFAULT_TENANT = "default"
+PREWARM = os.environ.get("PREWARM_BOT", "1") == "1"
+STATE_DIR = os.environ.get("STATE_DIR", "state")  # Saved Okta sessions (see sevaro_bot.py)
+
+
+class Tenant:
+    def __init__(self, tenant_id, bot_token, chat_id, log, on_change, browser_endpoint=None):
+        self.id = tenant_id
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        prefix = "" if tenant_id == DEFAULT_TENANT else f"[{tenant_id}] "
+        self.log = lambda msg, public=None, **fields: log(
+            f"{prefix}{msg}", public=None if public is None else f"{prefix}{public}", tenant=tenant_id, **fields
+        )
+        self.on_change = on_change  # Called whenever dashboard-visible state changes
+        self.browser_endpoint = browser_endpoint  # Returns the shared browser's CDP endpoint, if any
+        self.notifier = TelegramNotifier(bot_token, chat_id, self.log, on_delivery=self._on_telegram_delivery)
+        self.timer = DeadlineTimer(TIMER_DURATION, WARNING_TIME, self.on_timer_warning, self.on_timer_expired)
+
+        self.bot_lock = Lock()
+        self.bot_process = None
+        self.bot_channel = None  # Event channel to the running bot (guarded by bot_lock)
+        self.warm_process = None  # Idle bot waiting for Start, and its channel (guarded by bot_lock)
+        self.warm_channel = None
+        self.case_lock = Lock()
+        self.pending_case = None  # Last accepted case awaiting acknowledge
+        self.seen_cases = []  # Pending cases the bot is skipping as not credentialed
+        self.last_heartbeat = None
+
+    # ---------------- TELEGRAM ---------------- #
+
+    def send_telegram(self, msg, on_done=None):
+        """Queue a Telegram notification without blocking the caller.
+        `on_done(ok)` runs once delivery succeeds or ultimately fails."""
+        self.notifier.send(msg, on_done)
+
+    def send_telegram_or_die(self, msg):
+        """Queue a Telegram notification. Kill bot if it ultimately fails to deliver."""
+        def on_done(ok):
+            if not ok:
+                # Killing waits on the process; keep the notifier thread free meanwhile
+                Thread(target=self._kill_bot_after_telegram_failure, daemon=True).start()
+        self.send_telegram(msg, on_done)
+
+    def _on_telegram_delivery(self, ok, seconds):
+        labels = {"tenant": self.id, "source": "supervisor"}
+        REGISTRY.record("sevaro_telegram_send_seconds", seconds, labels)
+        if not ok:
+            REGISTRY.record("sevaro_telegram_failures_total", 1, labels)
+
+    def _kill_bot_after_telegram_failure(self):
+        self.log("❌ Telegram failed. Killing bot.", event="telegram_failed")
+        with self.bot_lock:
+            # _wait_for_exit clears the session (pending case, seen cases, timer) once it is gone
+            self.kill_bot_process()
+
+    # ---------------- STATE ---------------- #
+
+    def is_bot_running(self):
+        """Check if bot process is currently running (must hold bot_lock)."""
+        return self.bot_process is not None and self.bot_process.poll() is None
+
+    def status(self):
+        with self.bot_lock:
+            return "RUNNING" if self.is_bot_running() else "STOPPED"
+
+    def needs_acknowledge(self):
+        with self.case_lock:
+            return self.pending_case is not None
+
+    def get_status_data(self):
+        """Get current status, time remaining, and acknowledge state."""
+        t = self.timer.remaining()
+        h, rem = divmod(t, 3600)
+        m, s = divmod(rem, 60)
+        status = self.status()
+        heartbeat = self.last_heartbeat
+        heartbeat_age = round(time.time() - heartbeat) if heartbeat and status == "RUNNING" else None
+
+        return {
+            "status": status,
+            "hours": h,
+            "minutes": m,
+            "seconds": s,
+            "needs_acknowledge": self.needs_acknowledge(),
+            "heartbeat_age": heartbeat_age,
+            "seen_cases": self.get_seen_cases(),
+        }
+
+    def get_event_state(self):
+        """State pushed to dashboards. The countdown itself runs client-side from `deadline`."""
+        deadline = self.timer.deadline()
+        status = self.status()
+        return {
+            "status": status,
+            "needs_acknowledge": self.needs_acknowledge(),
+            "deadline": round(deadline * 1000) if deadline and status == "RUNNING" else None,
+            "seen_cases": self.get_seen_cases(),
+        }
+
+    def set_pending_case(self, case):
+        with self.case_lock:
+            self.pending_case = case
+        self.on_change()
+
+    def get_seen_cases(self):
+        """Skipped cases for the dashboard: hospital and when the bot will re-check them (epoch ms).
+        The MRN stays out, since /status and /events are served to the browser."""
+        with self.case_lock:
+            return [
+                {"hospital": case.get("hospital"), "expires_at": round(case.get("expires_at", 0) * 1000)}
+                for case in self.seen_cases
+            ]
+
+    def set_seen_cases(self, cases):
+        with self.case_lock:
+            self.seen_cases = cases
+        self.on_change()
+
+    # ---------------- TIMER ---------------- #
+
+    def reset_timer(self):
+        """Reset timer to full duration."""
+        self.timer.start()
+        self.on_change()
+
+        # Also reset bot's internal failsafe timer
+        if self.is_bot_running() and self.bot_channel is not None:
+            self.bot_channel.send(channel.TIMER_RESET)
+
+    def stop_timer(self):
+        """Stop the countdown (bot stopped or died)."""
+        self.timer.cancel()
+        self.on_change()
+
+    def on_timer_warning(self):
+        self.send_telegram_or_die("⚠️ Bot timer expires in 5 minutes! Refresh to extend.")
+
+    def on_timer_expired(self):
+        with self.bot_lock:
+            if self.is_bot_running():
+                self.log(f"Auto-stopping bot after {TIMER_DURATION} seconds.", event="timer_expired")
+                self.send_telegram("⏰ Bot timer expired. Stopping bot.")  # Don't kill on failure, already stopping
+                self.kill_bot_process()
+        self.on_change()
+
+    # ---------------- CHANNEL ---------------- #
+
+    def on_case_accepted(self, message):
+        self.log(f"📥 Bot accepted a case ({message.get('hospital')}); waiting for acknowledge.",
+                 public="📥 Bot accepted a case; waiting for acknowledge.")
+        self.set_pending_case(message)
+
+    def on_seen_cases(self, message):
+        self.set_seen_cases(message.get("cases") or [])
+
+    def on_heartbeat(self, message):
+        self.last_heartbeat = time.time()
+
+    def on_log(self, message):
+        """A bot's log record: into the supervisor's log file and /logs, labelled with this tenant."""
+        record = message.get("record")
+        if isinstance(record, dict):
+            logs.emit(dict(record, tenant=self.id))
+
+    def on_metric(self, message):
+        labels = dict(message.get("labels") or {}, tenant=self.id)
+        if not REGISTRY.record(message.get("name"), message.get("value", 0), labels):
+            self.log(f"⚠️ Ignoring unknown metric from bot: {message.get('name')}")
+
+    def update_metrics(self, own_browser=True):
+        """Refresh the scrape-time gauges: running state and, unless Chromium is shared, its RSS."""
+        with self.bot_lock:
+            proc = self.bot_process if self.is_bot_running() else None
+        REGISTRY.record("sevaro_bot_running", int(proc is not None), {"tenant": self.id})
+        rss = chromium_rss_bytes(proc.pid) if proc and own_browser else None
+        if rss is None:
+            REGISTRY.clear("sevaro_chromium_rss_bytes", tenant=self.id)
+        else:
+            REGISTRY.record("sevaro_chromium_rss_bytes", rss, {"tenant": self.id})
+
+    def open_bot_channel(self):
+        """Create the supervisor end of a channel. Returns (channel, socket to hand to the bot)."""
+        bot_channel, child_sock = channel.EventChannel.create_pair(self.log)
+        bot_channel.on(channel.CASE_ACCEPTED, self.on_case_accepted)
+        bot_channel.on(channel.HEARTBEAT, self.on_heartbeat)
+        bot_channel.on(channel.METRIC, self.on_metric)
+        bot_channel.on(channel.SEEN_CASES, self.on_seen_cases)
+        bot_channel.on(channel.LOG, self.on_log)
+        return bot_channel, child_sock
+
+    # ---------------- BOT ---------------- #
+
+    def bot_env(self, browser_endpoint=None):
+        """Environment for this tenant's bot process. Credentials are sent with Start instead."""
+        env = os.environ.copy()
+        for name in ("EMAIL", "PASSWORD", "OTP"):
+            env.pop(name, None)
+        env["TELEGRAM_BOT_TOKEN"] = self.bot_token
+        env["TELEGRAM_CHAT_ID"] = self.chat_id
+        env["TIMER_DURATION"] = str(TIMER_DURATION)
+        if self.id != DEFAULT_TENANT:
+            # Keep each user's saved session and debug dumps apart
+            env["STORAGE_STATE_FILE"] = os.path.join(STATE_DIR, f"okta_state_{self.id}.json")
+            env["CADENCE_STATS_FILE"] = f"case_arrivals_{self.id}.json"
+            env["DUMP_DIR"] = os.path.join("data", self.id)
+        if browser_endpoint:
+            env[CDP_ENDPOINT_ENV] = browser_endpoint
+        return env
+
+    def _spawn_bot(self, browser_endpoint):
+        """Launch a bot process that starts its browser and waits for Start. Must hold bot_lock."""
+        bot_channel, child_sock = self.open_bot_channel()
+        env = dict(self.bot_env(browser_endpoint), **{channel.CHANNEL_FD_ENV: str(child_sock.fileno())})
+        try:
+            proc = subprocess.Popen(
+                ["python", "-u", "sevaro_bot.py"],
+                env=env,
+                stdout=sys.stdout,
+                stderr=sys.stderr,
+                pass_fds=(child_sock.fileno(),),
+                start_new_session=True,  # Create process group for clean kills
+            )
+        finally:
+            child_sock.close()
+        bot_channel.start()
+        Thread(target=self._wait_for_exit, args=(proc, bot_channel), name=f"bot-{self.id}", daemon=True).start()
+        return proc, bot_channel
+
+    def prewarm(self):
+        """Launch an idle bot for the next Start, unless one is already waiting or running."""
+        if not PREWARM:
+            return
+        try:
+            endpoint = self.browser_endpoint() if self.browser_endpoint else None
+        except Exception as e:
+            self.log(f"⚠️ Could not prewarm bot, shared browser unavailable: {e}")
+            return
+        with self.bot_lock:
+            if self.is_bot_running() or (self.warm_process and self.warm_process.poll() is None):
+                return
+            self.warm_process, self.warm_channel = self._spawn_bot(endpoint)
+        self.log("🔥 Bot prewarmed.")
+
+    def discard_prewarmed(self):
+        """Stop the idle bot, if any (the supervisor is going away)."""
+        with self.bot_lock:
+            warm_channel, self.warm_process, self.warm_channel = self.warm_channel, None, None
+        if warm_channel:
+            warm_channel.close()  # The bot exits when its channel closes
+
+    def _take_warm_bot(self):
+        """The prewarmed bot if it is still alive, else None. Must hold bot_lock."""
+        proc, bot_channel = self.warm_process, self.warm_channel
+        self.warm_process = self.warm_channel = None
+        if proc is None:
+            return None
+        if proc.poll() is None:
+            return proc, bot_channel
+        bot_channel.close()
+        return None
+
+    def start_bot_process(self, email, password, otp):
+        """Hand the credentials to the prewarmed bot (or launch one) and return once it has them;
+        a thread cleans up when it exits. Returns False if a bot was already running."""
+        credentials = {"email": email, "password": password, "otp": otp}
+        with self.bot_lock:
+            if self.is_bot_running():
+                self.log("Bot already running.")
+                return False
+            warm = self._take_warm_bot()
+            started = warm is not None and self._hand_start(warm, credentials)
+            if started:
+                self.log("🔥 Using prewarmed bot.")
+
+        if not started:
+            endpoint = None
+            if self.browser_endpoint:
+                try:
+                    endpoint = self.browser_endpoint()
+                except Exception as e:
+                    self.log(f"❌ Shared browser unavailable: {e}")
+                    self.send_telegram("❌ Could not start the shared browser. Please try again.")
+                    raise
+            with self.bot_lock:
+                if not self._hand_start(self._spawn_bot(endpoint), credentials):
+                    self.log("❌ Could not send Start to the bot.")
+                    self.send_telegram("❌ Could not start the bot. Please try again.")
+                    raise RuntimeError("bot channel closed before Start")
+        self.on_change()
+
+        self.send_telegram_or_die("🟢 Bot started.")
+        return True
+
+    def _hand_start(self, bot, credentials):
+        """Make `bot` (process, channel) the session's and send it Start. Must hold bot_lock.
+        The session is reset before the bot can report anything. If the send fails the bot
+        is put back as idle before it is killed, so _wait_for_exit does not report a stop."""
+        self.reset_timer()
+        self.set_pending_case(None)
+        self.set_seen_cases([])
+        self.bot_process, self.bot_channel = bot
+        if bot[1].send(channel.START, **credentials):
+            return True
+        self.bot_process = self.bot_channel = None
+        self.stop_timer()
+        self.warm_process, self.warm_channel = bot
+        self._kill_group(bot[0])
+        return False
+
+    def _wait_for_exit(self, proc, bot_channel):
+        proc.wait()
+        with self.bot_lock:
+            was_idle = self.warm_process is proc
+            if was_idle:
+                self.warm_process = None
+                self.warm_channel = None
+            elif self.bot_process is proc:
+                self.bot_process = None
+                self.bot_channel = None
+                self.set_pending_case(None)
+                self.set_seen_cases([])
+                self.stop_timer()
+        bot_channel.close()
+        if was_idle:
+            # It never got Start (e.g. the shared browser restarted); the next Start launches a bot
+            return
+        self.log("Bot stopped.", event="bot_stopped")
+
+        self.send_telegram("🔴 Bot has stopped.")
+        self.prewarm()
+
+    @staticmethod
+    def _kill_group(proc):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, OSError):
+            pass
+
+    def kill_bot_process(self):
+        """Gracefully stop bot process. Must hold bot_lock."""
+        if not self.is_bot_running():
+            return
+
+        proc = self.bot_process
+        try:
+            # Ask only the Python process to stop so it can cleanly close the browser
+            if self.bot_channel is None or not self.bot_channel.send(channel.SHUTDOWN):
+                os.kill(proc.pid, signal.SIGTERM)
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            # Process didn't exit gracefully; kill the entire process group
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait(timeout=5)
+            except (subprocess.TimeoutExpired, ProcessLookupError, OSError):
+                pass
+        except (ProcessLookupError, OSError):
+            pass
+
+    # ---------------- ACTIONS ---------------- #
+
+    # Each returns a short outcome that the UI shows for the operation.
+
+    def stop(self):
+        self.stop_timer()
+        with self.bot_lock:
+            was_running = self.is_bot_running()
+            self.kill_bot_process()
+        return "stopped" if was_running else "not running"
+
+    def refresh(self):
+        with self.bot_lock:
+            if not self.is_bot_running():
+                return "not running"
+            self.reset_timer()
+        self.send_telegram_or_die("🔄 Timer refreshed to 1 hour.")
+        return "timer refreshed"
+
+    def acknowledge(self):
+        with self.case_lock:
+            pending = self.pending_case
+        if pending is None:
+            return "nothing to acknowledge"
+        with self.bot_lock:
+            delivered = self.bot_channel is not None and self.bot_channel.send(channel.ACKNOWLEDGE)
+        if not delivered:
+            raise RuntimeError("bot is not reachable")
+        self.set_pending_case(None)
+        self.log("👤 User acknowledged accepted case.", event="acknowledged")
+        return "acknowledged"